@@ -93,6 +93,8 @@ class AgentState(TypedDict):
                                    AIMessage, ToolMessage]], operator.add]
     user_info: dict
     products_df: object
+    catalog: object
+    product_ids: Optional[List[int]]
     current_agent: Optional[str]
     routing_info: Optional[dict]
     specialist_agents: dict
@@ -224,9 +226,14 @@ Would you like to browse a specific category or learn more about our EarthScore
         if current_agent == "shopping_assistant":
             result = specialist.handle_request(
                 last_message.content,
-                state["products_df"],
+                state["catalog"],
                 {"user_id": state["user_info"]["user_id"]}
             )
+        elif current_agent == "sustainability_advisor":
+            result = specialist.handle_request(
+                last_message.content,
+                {"user_id": state["user_info"]["user_id"], "catalog": state["catalog"]}
+            )
         elif current_agent == "checkout_assistant":
             result = specialist.handle_request(
                 last_message.content,
@@ -249,12 +256,16 @@ Would you like to browse a specific category or learn more about our EarthScore
         formatted_response = f"{agent_emoji} **{current_agent.replace('_', ' ').title()}**:\n\n{result['response']}"
 
         # If products were found, add them to response
+        product_ids = []
         if "products" in result and result["products"]:
             formatted_response += "\n\n📦 **Found Products:**\n"
             for product in result["products"]:
                 formatted_response += f"- {product['product_name']} - ${product['price']:.2f} (EarthScore: {product.get('earth_score', 'N/A')})\n"
+                if product.get('product_id') is not None:
+                    product_ids.append(int(product['product_id']))
 
-        return {"messages": [AIMessage(content=formatted_response)]}
+        # The listed products also travel as ids, so callers need not re-parse the text
+        return {"messages": [AIMessage(content=formatted_response)], "product_ids": product_ids}
 
     # Fallback to main agent
     response = llm.invoke(state["messages"])
@@ -287,10 +298,10 @@ def tool_node(state: AgentState):
     # Prepare arguments
     tool_args = tool_call["args"].copy()
     if tool_name in ["search_products_by_category", "get_product_details"]:
-        tool_args['products_df'] = state['products_df']
+        tool_args['catalog'] = state['catalog']
     elif tool_name == 'add_to_cart':
         tool_args['user_id'] = state['user_info']['user_id']
-        tool_args['products_df'] = state['products_df']
+        tool_args['catalog'] = state['catalog']
     elif tool_name == 'view_cart':
         tool_args['user_id'] = state['user_info']['user_id']
 
@@ -1,6 +1,6 @@
-import pandas as pd
 import json
 from services.cart_service import CartService
+from services.catalog_service import ProductCatalog
 
 # These are now plain Python functions. The agent will not see these directly.
 # Their job is to contain the logic.
@@ -9,52 +9,56 @@ from services.cart_service import CartService
 cart_service = CartService()
 
 
-def implement_search_by_category(category: str, products_df: pd.DataFrame) -> str:
+def implement_search_by_category(category: str, catalog: ProductCatalog) -> str:
     """The internal logic for searching by category."""
     print(f"--- IMPL: Searching for category: {category} ---")
-    results = products_df[products_df['category'].str.contains(
-        category, case=False, na=False)]
-    if results.empty:
+    positions = catalog.category_positions(category, partial=True)
+    if len(positions) == 0:
         return json.dumps({"error": f"No products found in the '{category}' category."})
-    response_list = results.head(
-        5)[['product_name', 'product_id']].to_dict(orient='records')
+    response_list = catalog.records(positions[:5], ['product_name', 'product_id'])
     return json.dumps(response_list)
 
 
-def implement_get_details(product_name: str, products_df: pd.DataFrame) -> str:
+def _candidate_names(candidates: list, catalog: ProductCatalog) -> list:
+    """Product names to offer back when a name does not resolve to one product"""
+    return [catalog.df.iloc[pos]['product_name'] for pos in candidates]
+
+
+def implement_get_details(product_name: str, catalog: ProductCatalog) -> str:
     """The internal logic for getting product details."""
     print(f"--- IMPL: Getting details for: {product_name} ---")
-    results = products_df[products_df['product_name'].str.contains(
-        product_name, case=False, na=False)]
-    if results.empty:
-        return json.dumps({"error": f"Could not find a product named '{product_name}'."})
+    pos, candidates = catalog.match_name(product_name)
+    if pos is None:
+        error = {"error": f"Could not find a product named '{product_name}'."}
+        if candidates:
+            error["did_you_mean"] = _candidate_names(candidates, catalog)
+        return json.dumps(error)
 
-    product_details = results.iloc[0].to_dict()
-    # Convert any non-standard types (like numpy int64) to standard Python types for JSON
-    for key, value in product_details.items():
-        if hasattr(value, 'item'):
-            product_details[key] = value.item()
-    return json.dumps(product_details)
+    # record() converts numpy types to standard Python types for JSON
+    return json.dumps(catalog.record(pos))
 
 
 # Now, UPDATE the implement_add_to_cart function (replace the existing one):
-def implement_add_to_cart(user_id: str, product_name: str, quantity: int, products_df: pd.DataFrame) -> str:
+def implement_add_to_cart(user_id: str, product_name: str, quantity: int, catalog: ProductCatalog) -> str:
     """The internal logic for adding an item to the cart - now with real cart management"""
     print(
         f"--- IMPL: Adding to cart for user {user_id}: {quantity} of {product_name} ---")
 
-    # Find the product in the dataframe
-    results = products_df[products_df['product_name'].str.contains(
-        product_name, case=False, na=False)]
+    # Find the product in the catalog: exact, near-exact typo or the only
+    # name containing it; anything ambiguous is offered back, never guessed
+    pos, candidates = catalog.match_name(product_name)
 
-    if results.empty:
-        return json.dumps({
+    if pos is None:
+        error = {
             "status": "error",
             "message": f"Could not find product '{product_name}'"
-        })
+        }
+        if candidates:
+            error["did_you_mean"] = _candidate_names(candidates, catalog)
+        return json.dumps(error)
 
     # Get product details
-    product = results.iloc[0]
+    product = catalog.df.iloc[pos]
     product_id = int(product['product_id'])
     price = float(product['price'])
 
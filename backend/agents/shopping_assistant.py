@@ -2,11 +2,12 @@
 """
 Shopping Assistant Agent - Handles product searches and recommendations
 """
-from services.filter_service import ProductFilterService
+from services.alternatives_service import parse_alternatives_request
+from services.catalog_service import ProductCatalog
+from services.query_parser import is_selective, strip_ordering_terms
 from utils.message_templates import MessageTemplates
 from typing import Dict, List, Optional
 import json
-import pandas as pd
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 import os
@@ -27,14 +28,14 @@ class ShoppingAssistantAgent:
             temperature=0.3
         )
 
-    def search_products(self, query: str, products_df: pd.DataFrame,
+    def search_products(self, query: str, catalog: ProductCatalog,
                         filters: Optional[Dict] = None) -> List[Dict]:
         """Enhanced search with category support and natural language processing"""
+        products_df = catalog.df
         
         # If filters are provided, use them
         if filters:
-            filter_service = ProductFilterService(products_df)
-            return filter_service.filter_products(**filters)
+            return catalog.filter_service.filter_products(**filters)
         
         # Category mapping for natural language
         category_keywords = {
@@ -54,28 +55,24 @@ class ShoppingAssistantAgent:
                 detected_category = category
                 break
         
+        # Eco wording narrows results to EarthScore >= 70 (a range-index slice)
+        has_earth_score = 'earth_score' in products_df.columns
+        
         # If category detected, filter by category
         if detected_category:
-            results = products_df[products_df['category'] == detected_category]
-            
-            # If query also contains eco/sustainable, filter by high EarthScore
-            if any(word in query_lower for word in ['eco', 'sustainable', 'green', 'eco-friendly']):
-                if 'earth_score' in results.columns:
-                    results = results[results['earth_score'] >= 70]
-            
-            # Sort by earth_score
-            if 'earth_score' in results.columns:
-                results = results.sort_values('earth_score', ascending=False)
-            
-            return results.head(10).to_dict('records')
+            eco_query = any(word in query_lower for word in ['eco', 'sustainable', 'green', 'eco-friendly'])
+            return catalog.filter_service.filter_products(
+                category=detected_category,
+                earth_score_min=70 if eco_query and has_earth_score else None,
+                sort_by='earth_score',
+                limit=10
+            )
         
         # Original eco-keyword search
         eco_keywords = ['eco', 'sustainable', 'green', 'eco-friendly', 'environmental']
-        if any(keyword in query_lower for keyword in eco_keywords):
-            if 'earth_score' in products_df.columns:
-                results = products_df[products_df['earth_score'] >= 70]
-                results = results.sort_values('earth_score', ascending=False)
-                return results.head(10).to_dict('records')
+        if any(keyword in query_lower for keyword in eco_keywords) and has_earth_score:
+            return catalog.filter_service.filter_products(
+                earth_score_min=70, sort_by='earth_score', limit=10)
         
         # General search
         stop_words = {
@@ -93,26 +90,35 @@ class ShoppingAssistantAgent:
                 return products_df.nlargest(10, 'earth_score').to_dict('records')
             return products_df.head(10).to_dict('records')
         
-        # Search in product names and categories
-        search_pattern = '|'.join(search_words)
-        mask = (
-            products_df['product_name'].str.contains(search_pattern, case=False, na=False, regex=True) |
-            products_df['category'].str.contains(search_pattern, case=False, na=False, regex=True)
-        )
+        # Search in product names and categories via the token index;
+        # products matching more of the words rank first, then by earth_score
+        positions = catalog.search_text(search_words, limit=10)
         
-        results = products_df[mask]
+        if len(positions) == 0:
+            # No literal match: try the offline semantic index, which also
+            # catches misspellings and word variants
+            positions = catalog.semantic_search(" ".join(search_words), limit=10)
         
-        if results.empty:
+        if len(positions) == 0:
             # If no results, return top products
             if 'earth_score' in products_df.columns:
                 return products_df.nlargest(10, 'earth_score').to_dict('records')
             return products_df.head(10).to_dict('records')
         
-        # Sort by earth_score if available
-        if 'earth_score' in results.columns:
-            results = results.sort_values('earth_score', ascending=False)
-        
-        return results.head(10).to_dict('records')
+        return products_df.iloc[positions].to_dict('records')
+
+    @staticmethod
+    def order_results(products: List[Dict], sort_by: Optional[str] = None,
+                      ascending: bool = False, limit: Optional[int] = None) -> List[Dict]:
+        """Sort search results by a column (missing values last) and cap them"""
+        if sort_by:
+            present, missing = [], []
+            for product in products:
+                value = product.get(sort_by)
+                # NaN != NaN
+                (present if value is not None and value == value else missing).append(product)
+            products = sorted(present, key=lambda p: p[sort_by], reverse=not ascending) + missing
+        return products[:limit] if limit is not None else products
 
     def generate_response(self, query: str, products: List[Dict], 
                          user_context: Optional[Dict] = None) -> str:
@@ -171,7 +177,7 @@ Or ask me to show you our highest-rated eco-friendly products!"""
         
         return response
 
-    def handle_request(self, message: str, products_df: pd.DataFrame,
+    def handle_request(self, message: str, catalog: ProductCatalog,
                        user_context: Optional[Dict] = None) -> Dict:
         """Handle a shopping request with enhanced filtering"""
 
@@ -185,19 +191,38 @@ Or ask me to show you our highest-rated eco-friendly products!"""
                 "agent": "shopping_assistant"
             }
 
-        # Initialize filter service
-        filter_service = ProductFilterService(products_df)
+        # "Alternatives to <product>" comes from the nearest-neighbour index,
+        # but only when the product resolves by id or near-exact name;
+        # anything else is an ordinary filter/search query
+        product_reference = parse_alternatives_request(message)
+        pos = catalog.resolve_product(product_reference) if product_reference else None
+        if pos is not None:
+            alternatives = catalog.records(catalog.greener_alternatives(pos, k=5))
+            return {
+                "response": MessageTemplates.get_alternatives_message(catalog.record(pos), alternatives),
+                "products": alternatives,
+                "agent": "shopping_assistant",
+                "filters_applied": None
+            }
+
+        # Shared filter service (indexes are built once per catalog)
+        filter_service = catalog.filter_service
 
         # Parse the query for filters
         filters = filter_service.parse_filter_query(message)
 
-        # If filters were detected, use the filter service
-        if filters:
+        # If the query selects products (category, score or price bounds),
+        # use the filter service; a sort or limit on its own ("best water
+        # bottle") orders the text search results instead
+        if is_selective(filters):
             products = filter_service.filter_products(**filters)
 
             # Get contextual message based on filters
+            category = filters.get('category')
+            if isinstance(category, list):
+                category = " & ".join(category)
             context_message = MessageTemplates.get_filter_message(
-                category=filters.get('category'),
+                category=category,
                 score=filters.get('earth_score_min')
             )
 
@@ -230,9 +255,13 @@ Or ask me to show you our highest-rated eco-friendly products!"""
                 response += "\n• Browse a different category"
             else:
                 response = f"No products found with those filters. Try adjusting your criteria!"
+        elif filters:
+            products = self.order_results(
+                self.search_products(strip_ordering_terms(message), catalog), **filters)
+            response = self.generate_response(message, products, user_context)
         else:
             # Use the existing search logic for non-filter queries
-            products = self.search_products(message, products_df)
+            products = self.search_products(message, catalog)
             response = self.generate_response(message, products, user_context)
 
         return {
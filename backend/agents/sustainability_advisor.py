@@ -7,6 +7,8 @@ from typing import Dict, List, Optional
 import json
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
+from services.alternatives_service import parse_alternatives_request
+from utils.message_templates import MessageTemplates
 import os
 
 
@@ -132,13 +134,36 @@ Keep it under 50 words and include a specific impact metric if possible.""")
         response = self.llm.invoke(messages)
         return response.content
 
+    def suggest_alternatives(self, product_reference: str, catalog) -> Optional[Dict]:
+        """Greener alternatives to a catalog product from the nearest-neighbour index"""
+        pos = catalog.resolve_product(product_reference)
+        if pos is None:
+            return None
+        product = catalog.record(pos)
+        alternatives = catalog.records(catalog.greener_alternatives(pos, k=5))
+        return {
+            "response": MessageTemplates.get_alternatives_message(product, alternatives),
+            "products": alternatives
+        }
+
     def handle_request(self, message: str, context: Optional[Dict] = None) -> Dict:
       """Handle a sustainability advice request"""
 
       # Determine the type of request
       message_lower = message.lower()
 
-      if "earthscore" in message_lower or "earth score" in message_lower:
+      # "Greener alternative to X" is answered from the catalog, not the LLM
+      catalog = (context or {}).get("catalog")
+      product_reference = parse_alternatives_request(message) if catalog is not None else None
+      alternatives = (self.suggest_alternatives(product_reference, catalog)
+                      if product_reference else None)
+      products = []
+
+      if alternatives:
+          response = alternatives["response"]
+          products = alternatives["products"]
+
+      elif "earthscore" in message_lower or "earth score" in message_lower:
           # Extract score if mentioned
           import re
           score_match = re.search(r'\b(\d+)\b', message)
@@ -189,6 +214,7 @@ Keep it under 50 words and include a specific impact metric if possible.""")
 
       return {
           "response": response,
+          "products": products,
           "agent": "sustainability_advisor",
           "educational_content": True
       }
@@ -1,13 +1,110 @@
-from ml.engine import calculate_earth_score
+from ml.engine import (calculate_earth_scores, calculate_earth_scores_parallel, scoring_fingerprint,
+                       FEATURES, MIN_ROWS_PER_WORKER)
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
+import numpy as np
+import argparse
+import heapq
+import shutil
 import sys
 import os
+import time
 
 # Add backend to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 
-def add_earthscores_to_csv():
+def score_products(products_df: pd.DataFrame, workers: int = 1,
+                   executor: ProcessPoolExecutor = None):
+    """
+    (scores, processes used) for a frame: one core, or a process pool when
+    workers > 1 and the frame is big enough to split
+    """
+    if workers > 1:
+        return calculate_earth_scores_parallel(products_df, workers, executor, return_workers=True)
+    return calculate_earth_scores(products_df), 1
+
+
+class ScoreIndex:
+    """
+    Sidecar index of product_id -> (hash of the eight scoring inputs, score).
+    Rows whose hash is unchanged reuse their cached score; the whole index
+    is discarded when the scoring rules (WEIGHTS / NORM_RANGES) change.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fingerprint = scoring_fingerprint()
+        self.product_ids = np.empty(0, dtype=np.int64)
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.scores = np.empty(0, dtype=np.int64)
+        self._updates = []
+        self.reused = 0
+        self.rescored = 0
+        # Most processes any rescoring call actually used
+        self.workers_used = 1
+
+        if os.path.exists(path):
+            with np.load(path) as index:
+                if str(index['fingerprint']) == self.fingerprint:
+                    self.product_ids = index['product_id']
+                    self.hashes = index['row_hash']
+                    self.scores = index['earth_score']
+                else:
+                    print("Scoring rules changed - cached EarthScores invalidated")
+        print(f"Score index: {len(self.product_ids)} cached products")
+
+    @staticmethod
+    def row_hashes(products_df: pd.DataFrame) -> np.ndarray:
+        # Cast first so 5 and 5.0 hash the same
+        inputs = products_df[FEATURES].astype(np.float64)
+        return pd.util.hash_pandas_object(inputs, index=False).to_numpy()
+
+    def score(self, products_df: pd.DataFrame, workers: int = 1,
+              executor: ProcessPoolExecutor = None) -> np.ndarray:
+        """Return scores for the frame, recomputing only new or changed rows"""
+        ids = products_df['product_id'].to_numpy(dtype=np.int64)
+        hashes = self.row_hashes(products_df)
+        scores = np.full(len(ids), -1, dtype=np.int64)
+
+        if len(self.product_ids):
+            pos = np.searchsorted(self.product_ids, ids)
+            pos = np.minimum(pos, len(self.product_ids) - 1)
+            hit = (self.product_ids[pos] == ids) & (self.hashes[pos] == hashes)
+            scores[hit] = self.scores[pos[hit]]
+
+        stale = scores < 0
+        if stale.any():
+            scores[stale], used = score_products(products_df[stale], workers, executor)
+            self.workers_used = max(self.workers_used, used)
+
+        self.reused += int((~stale).sum())
+        self.rescored += int(stale.sum())
+        self._updates.append((ids, hashes, scores))
+        return scores
+
+    def save(self):
+        """Replace the index with what this run scored (dropped products go away)"""
+        if not self._updates:
+            return
+        ids, hashes, scores = (np.concatenate(parts) for parts in zip(*self._updates))
+        order = np.argsort(ids, kind='stable')
+        np.savez(self.path, fingerprint=np.array(self.fingerprint),
+                 product_id=ids[order], row_hash=hashes[order], earth_score=scores[order])
+        print(f"Score index saved to {self.path} "
+              f"({self.reused} reused, {self.rescored} rescored)")
+
+
+def print_throughput(rows: int, seconds: float, workers: int, requested: int = None):
+    """`workers` is the number of processes that actually scored"""
+    rate = rows / seconds if seconds > 0 else float('inf')
+    capped = (f", {requested} requested: each worker needs {MIN_ROWS_PER_WORKER:,} rows"
+              if requested and requested > workers else "")
+    print(f"⏱️  Scored {rows} products in {seconds:.3f}s "
+          f"({rate:,.0f} rows/s, {workers} worker(s){capped})")
+
+
+def add_earthscores_to_csv(workers: int = 1, index: ScoreIndex = None):
     """Calculate EarthScores for all products and save to CSV"""
 
     # Load the products
@@ -20,8 +117,14 @@ def add_earthscores_to_csv():
 
     # Calculate EarthScore for each product
     print("Calculating EarthScores...")
-    products_df['earth_score'] = products_df.apply(
-        calculate_earth_score, axis=1)
+    start = time.perf_counter()
+    if index:
+        products_df['earth_score'] = index.score(products_df, workers)
+        workers_used = index.workers_used
+        index.save()
+    else:
+        products_df['earth_score'], workers_used = score_products(products_df, workers)
+    print_throughput(len(products_df), time.perf_counter() - start, workers_used, workers)
 
     # Show score distribution
     print("\nEarthScore Distribution:")
@@ -60,5 +163,172 @@ def add_earthscores_to_csv():
     print(bottom_eco)
 
 
+DISPLAY_COLUMNS = ['product_name', 'category', 'price', 'earth_score']
+
+
+class ScoreStats:
+    """Running distribution stats and top/bottom-N lists for streamed chunks"""
+
+    def __init__(self, n: int = 10):
+        self.n = n
+        self.count = 0
+        # EarthScores are integers in 0-100, so a histogram gives the exact median
+        self.histogram = np.zeros(101, dtype=np.int64)
+        self.total = 0
+        self._top = []     # min-heap of (score, -row, row_values)
+        self._bottom = []  # min-heap of (-score, -row, row_values)
+
+    def update(self, chunk: pd.DataFrame):
+        scores = chunk['earth_score'].to_numpy()
+        self.count += len(scores)
+        self.total += int(scores.sum())
+        self.histogram += np.bincount(np.clip(scores, 0, 100), minlength=101)
+
+        # Only the chunk's own top/bottom N can make it into the global lists
+        for row, product in chunk.nlargest(self.n, 'earth_score')[DISPLAY_COLUMNS].iterrows():
+            self._push(self._top, (product['earth_score'], -row, tuple(product)))
+        for row, product in chunk.nsmallest(self.n, 'earth_score')[DISPLAY_COLUMNS].iterrows():
+            self._push(self._bottom, (-product['earth_score'], -row, tuple(product)))
+
+    def _push(self, heap, item):
+        if len(heap) < self.n:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    def median(self) -> float:
+        cumulative = np.cumsum(self.histogram)
+        lower = int(np.searchsorted(cumulative, (self.count - 1) // 2 + 1))
+        upper = int(np.searchsorted(cumulative, self.count // 2 + 1))
+        return (lower + upper) / 2
+
+    def min(self) -> int:
+        return int(np.flatnonzero(self.histogram)[0])
+
+    def max(self) -> int:
+        return int(np.flatnonzero(self.histogram)[-1])
+
+    def mean(self) -> float:
+        return self.total / self.count
+
+    def top(self) -> pd.DataFrame:
+        rows = sorted(self._top, key=lambda item: (-item[0], -item[1]))
+        return pd.DataFrame([r[2] for r in rows], index=[-r[1] for r in rows],
+                            columns=DISPLAY_COLUMNS)
+
+    def bottom(self) -> pd.DataFrame:
+        rows = sorted(self._bottom, key=lambda item: (-item[0], -item[1]))
+        return pd.DataFrame([r[2] for r in rows], index=[-r[1] for r in rows],
+                            columns=DISPLAY_COLUMNS)
+
+
+def stream_earthscores_to_csv(input_path: str = "../data/products_large.csv",
+                              output_path: str = "../data/products_large_with_scores.csv",
+                              chunk_size: int = 100_000,
+                              update_original: bool = True,
+                              workers: int = 1,
+                              index: ScoreIndex = None):
+    """Calculate EarthScores chunk by chunk so memory stays flat for any file size"""
+
+    if workers > 1 and chunk_size < workers * MIN_ROWS_PER_WORKER:
+        # Smaller chunks would be scored by fewer processes than requested
+        chunk_size = workers * MIN_ROWS_PER_WORKER
+        print(f"Chunk size raised to {chunk_size} so {workers} workers get "
+              f"{MIN_ROWS_PER_WORKER:,} rows each")
+    print(f"Streaming products from {input_path} in chunks of {chunk_size}...")
+    stats = ScoreStats()
+    workers_used = 1
+    sample = None
+    scoring_seconds = 0.0
+    start = time.perf_counter()
+
+    # One pool for the whole run so worker start-up is paid once
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunk_size)):
+            chunk_start = time.perf_counter()
+            if index:
+                chunk['earth_score'] = index.score(chunk, workers, executor)
+                workers_used = index.workers_used
+            else:
+                chunk['earth_score'], used = score_products(chunk, workers, executor)
+                workers_used = max(workers_used, used)
+            scoring_seconds += time.perf_counter() - chunk_start
+            chunk.to_csv(output_path, mode='w' if i == 0 else 'a',
+                         header=(i == 0), index=False)
+            stats.update(chunk)
+            if sample is None:
+                sample = chunk[['product_name', 'category', 'earth_score']].head(10)
+            print(f"  chunk {i + 1}: {stats.count} products scored")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if index:
+        index.save()
+
+    if stats.count == 0:
+        print("No products found")
+        return
+
+    print_throughput(stats.count, scoring_seconds, workers_used, workers)
+    print(f"End-to-end (read + score + write): "
+          f"{stats.count / (time.perf_counter() - start):,.0f} rows/s")
+
+    # Show score distribution
+    print("\nEarthScore Distribution:")
+    print(f"Min: {stats.min()}")
+    print(f"Max: {stats.max()}")
+    print(f"Mean: {stats.mean():.2f}")
+    print(f"Median: {stats.median()}")
+
+    print("\nSample products with EarthScores:")
+    print(sample)
+    print(f"\n✅ Saved to {output_path}")
+
+    if update_original:
+        # Byte copies, so this step does not load the catalog either
+        root, ext = os.path.splitext(input_path)
+        backup_path = f"{root}_backup{ext}"
+        shutil.copy(input_path, backup_path)
+        shutil.copy(output_path, input_path)
+        print(f"✅ Updated original {input_path} (backup saved as {backup_path})")
+
+    print("\nTop 10 Most Eco-Friendly Products:")
+    print(stats.top())
+
+    print("\nBottom 10 Least Eco-Friendly Products:")
+    print(stats.bottom())
+
+
 if __name__ == "__main__":
-    add_earthscores_to_csv()
+    parser = argparse.ArgumentParser(description="Calculate EarthScores for the product catalog")
+    parser.add_argument("--stream", action="store_true",
+                        help="score the CSV in fixed-size chunks instead of loading it whole")
+    parser.add_argument("--chunk-size", type=int, default=100_000,
+                        help="rows per chunk in --stream mode")
+    parser.add_argument("--input", default="../data/products_large.csv")
+    parser.add_argument("--output", default="../data/products_large_with_scores.csv")
+    parser.add_argument("--no-update-original", action="store_true",
+                        help="in --stream mode, only write the output file")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of scoring processes (0 = one per CPU)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rescore products that are new or whose inputs changed")
+    parser.add_argument("--index", default=None,
+                        help="score index path for --incremental "
+                             "(default: <input>.scoreindex.npz)")
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+
+    index = None
+    if args.incremental:
+        index_path = args.index or f"{os.path.splitext(args.input)[0]}.scoreindex.npz"
+        index = ScoreIndex(index_path)
+
+    if args.stream:
+        stream_earthscores_to_csv(args.input, args.output, args.chunk_size,
+                                  update_original=not args.no_update_original,
+                                  workers=workers, index=index)
+    else:
+        add_earthscores_to_csv(workers, index)
@@ -1,13 +1,16 @@
 # main.py
 from fastapi import FastAPI
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import pandas as pd
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import os
 import pickle
 from langchain_core.messages import HumanMessage
 import json
+import time
 import uvicorn
 
 # Import the enhanced agent
@@ -17,8 +20,11 @@ from agent import create_greencart_agent
 from services.cart_service import CartService
 from services.group_buy_service import GroupBuyService
 from clustering_service import GroupBuyClusteringService
-from services.filter_service import ProductFilterService
 from services.express_checkout_service import ExpressCheckoutService
+from services.catalog_snapshot import load_snapshot, DEFAULT_CSV_PATH, DEFAULT_SNAPSHOT_DIR
+from services.catalog_service import ProductCatalog
+from ml.predictor import PATH_EXACT, PATH_MODEL, EarthScorePredictor, PredictionBatcher
+from ml.tree_export import load_trees
 from utils.message_templates import MessageTemplates
 
 app = FastAPI(title="GreenCart API")
@@ -40,36 +46,68 @@ app.add_middleware(
 
 # Global variables
 products_df = None
+catalog = None
 agent = None
 imputer = None
 model = None
+predictor = None
+predict_batcher = None
 cart_service = None
 group_buy_service = None
 clustering_service = None
 filter_service = None
 express_checkout_service = None
 
+
+def load_catalog() -> ProductCatalog:
+    """
+    Load the products from the binary snapshot if present, else from CSV,
+    and build the catalog indexes; time-to-ready covers both
+    """
+    start = time.perf_counter()
+    df = load_snapshot(DEFAULT_SNAPSHOT_DIR, DEFAULT_CSV_PATH)
+    source = "snapshot"
+    if df is None:
+        df = pd.read_csv(DEFAULT_CSV_PATH)
+        source = "CSV"
+    loaded = time.perf_counter()
+    catalog = ProductCatalog(df)
+    ready = time.perf_counter()
+    print(f"✅ Product data loaded from {source}: {len(df)} items "
+          f"(load {(loaded - start) * 1000:.1f} ms, indexes {(ready - loaded) * 1000:.1f} ms, "
+          f"ready in {(ready - start) * 1000:.1f} ms)")
+    return catalog
+
 # Startup Event
 @app.on_event("startup")
 def startup_event():
-    global products_df, agent, imputer, model, cart_service, group_buy_service, clustering_service, filter_service, express_checkout_service
+    global products_df, catalog, agent, imputer, model, predictor, predict_batcher, cart_service, group_buy_service, clustering_service, filter_service, express_checkout_service
 
     # Load product data
-    products_df = pd.read_csv("../data/products_large.csv")
-    print(f"✅ Product data loaded: {len(products_df)} items")
+    catalog = load_catalog()
+    products_df = catalog.df
 
     # Load ML models
     with open('ml/imputer.pkl', 'rb') as f:
         imputer = pickle.load(f)
-    with open('ml/model.pkl', 'rb') as f:
-        model = pickle.load(f)
+    # With an up-to-date tree export, xgboost is only loaded for large batches
+    trees = load_trees('ml/model_trees.npz', 'ml/model.pkl')
+    if trees is not None:
+        predictor = EarthScorePredictor(imputer, trees=trees, model_path='ml/model.pkl')
+    else:
+        with open('ml/model.pkl', 'rb') as f:
+            model = pickle.load(f)
+        predictor = EarthScorePredictor(imputer, model)
+    # Concurrent /api/predict calls share model calls (PREDICT_BATCH_WINDOW_MS=0 disables)
+    if float(os.getenv("PREDICT_BATCH_WINDOW_MS", "2")) > 0:
+        predict_batcher = PredictionBatcher(predictor)
     print("✅ ML models loaded")
 
     # Initialize services
     cart_service = CartService()
     group_buy_service = GroupBuyService()
     clustering_service = GroupBuyClusteringService('../data/users_pincodes.csv')
-    filter_service = ProductFilterService(products_df)
+    filter_service = catalog.filter_service
     express_checkout_service = ExpressCheckoutService()
     print("✅ Services initialized")
 
@@ -85,51 +123,219 @@ def read_root():
     return {"status": "ok", "service": "GreenCart API"}
 
 
-@app.get("/api/products")
-def get_all_products():
-    if products_df is not None:
-        return products_df.to_dict(orient="records")
-    raise HTTPException(status_code=503, detail="Products not loaded yet")
+def _catalog_etag() -> str:
+    return f'"{catalog.version}"'
 
 
-@app.get("/api/products/{product_id}")
-def get_product_by_id(product_id: int):
-    product = products_df[products_df['product_id'] == product_id]
-    if product.empty:
-        raise HTTPException(
-            status_code=404, detail=f"Product {product_id} not found")
-    return product.iloc[0].to_dict()
+def _not_modified(request: Request) -> Optional[Response]:
+    """304 response if the client already has this catalog version"""
+    etag = _catalog_etag()
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def _json_bytes_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    headers = dict(headers or {}, ETag=_catalog_etag())
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/products")
+def get_all_products(
+    request: Request,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None,
+    format: str = "json"
+):
+    """
+    List products, optionally paginated (offset/limit) and projected
+    (?fields=product_id,price,earth_score). format=ndjson streams one
+    product per line. The total and the next page's offset are returned
+    in the X-Total-Count and X-Next-Offset headers.
+    """
+    if catalog is None:
+        raise HTTPException(status_code=503, detail="Products not loaded yet")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="offset and limit must be >= 0")
+
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    if field_list:
+        try:
+            catalog.check_fields(field_list)
+        except KeyError as e:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {e.args[0]}")
+
+    not_modified = _not_modified(request)
+    if not_modified:
+        return not_modified
+
+    total = len(catalog)
+    offset = min(offset, total)
+    stop = total if limit is None else min(offset + limit, total)
+    headers = {"X-Total-Count": str(total), "ETag": _catalog_etag()}
+    if stop < total:
+        headers["X-Next-Offset"] = str(stop)
+
+    if format == "ndjson":
+        return StreamingResponse(
+            catalog.iter_ndjson(offset, stop, field_list),
+            media_type="application/x-ndjson",
+            headers=headers
+        )
+    if field_list:
+        return JSONResponse(catalog.records(slice(offset, stop), field_list), headers=headers)
+    return _json_bytes_response(catalog.json_array(range(offset, stop)), headers)
 
 # Enhanced products endpoint with filtering
+# (declared before /api/products/{product_id} so "filter" is not taken as an id)
 @app.get("/api/products/filter")
 def filter_products(
+    request: Request,
     category: Optional[str] = None,
     earth_score_min: Optional[int] = None,
     earth_score_max: Optional[int] = None,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
     sort_by: str = "earth_score",
     limit: int = 20
 ):
     """Get filtered products"""
-    filtered = filter_service.filter_products(
+    not_modified = _not_modified(request)
+    if not_modified:
+        return not_modified
+
+    positions = filter_service.filter_positions(
         category=category,
         earth_score_min=earth_score_min,
         earth_score_max=earth_score_max,
         sort_by=sort_by,
-        limit=limit
+        limit=limit,
+        price_min=price_min,
+        price_max=price_max
     )
-    return {
-        "products": filtered,
-        "count": len(filtered),
-        "filters_applied": {
-            "category": category,
-            "earth_score_min": earth_score_min,
-            "earth_score_max": earth_score_max
-        }
+    filters_applied = {
+        "category": category,
+        "earth_score_min": earth_score_min,
+        "earth_score_max": earth_score_max,
+        "price_min": price_min,
+        "price_max": price_max
     }
+    # Assembled from the cached per-product JSON instead of re-encoding rows
+    body = (b'{"products":' + catalog.json_array(positions)
+            + b',"count":' + str(len(positions)).encode()
+            + b',"filters_applied":' + json.dumps(filters_applied).encode() + b'}')
+    return _json_bytes_response(body)
+
+
+# Batch fetch for cart / checkout / group-buy hydration
+MAX_BATCH_IDS = 500
+
+
+class ProductBatchRequest(BaseModel):
+    ids: List[int]
+    fields: Optional[List[str]] = None
+
+
+@app.post("/api/products/batch")
+def get_products_batch(request: ProductBatchRequest):
+    """
+    Products for many ids in one request, in request order.
+    Unknown ids come back as null and are listed under "missing".
+    """
+    if len(request.ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {MAX_BATCH_IDS} ids per request")
+    try:
+        fields = catalog.check_fields(request.fields) if request.fields else None
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {e.args[0]}")
+
+    positions = catalog.positions_of(request.ids)
+    found = positions >= 0
+    missing = [product_id for product_id, hit in zip(request.ids, found.tolist()) if not hit]
+
+    if fields is None:
+        fragments = iter(catalog.product_json(positions[found]))
+    else:
+        fragments = (json.dumps(record, separators=(',', ':')).encode()
+                     for record in catalog.records(positions[found], fields))
+    items = [next(fragments) if hit else b"null" for hit in found.tolist()]
+    body = (b'{"products":[' + b",".join(items) + b']'
+            + b',"missing":' + json.dumps(missing).encode()
+            + b',"count":' + str(int(found.sum())).encode() + b'}')
+    return _json_bytes_response(body)
+
+
+# Search-box typeahead (declared before {product_id} as well)
+@app.get("/api/products/suggest")
+def suggest_products(q: str = "", limit: int = 8):
+    """Products completing the typed prefix, highest EarthScore first"""
+    positions = catalog.suggest_trie.suggest(q, limit=min(max(limit, 0), catalog.suggest_trie.top_n))
+    suggestions = catalog.records(positions, ["product_id", "product_name", "category", "earth_score"])
+    return {"query": q, "suggestions": suggestions}
+
+
+# Facet counts for the active filters (also declared before {product_id})
+@app.get("/api/products/facets")
+def product_facets(
+    request: Request,
+    category: Optional[str] = None,
+    earth_score_min: Optional[int] = None,
+    earth_score_max: Optional[int] = None,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None
+):
+    """Counts per category, EarthScore band and price bucket under the filters"""
+    not_modified = _not_modified(request)
+    if not_modified:
+        return not_modified
+
+    filters_applied = {
+        "category": category,
+        "earth_score_min": earth_score_min,
+        "earth_score_max": earth_score_max,
+        "price_min": price_min,
+        "price_max": price_max
+    }
+    result = catalog.facet_index.counts(**filters_applied)
+    result["filters_applied"] = filters_applied
+    return JSONResponse(result, headers={"ETag": _catalog_etag()})
+
+
+@app.get("/api/products/{product_id}")
+def get_product_by_id(request: Request, product_id: int):
+    pos = catalog.position_of(product_id)
+    if pos is None:
+        raise HTTPException(
+            status_code=404, detail=f"Product {product_id} not found")
+    not_modified = _not_modified(request)
+    if not_modified:
+        return not_modified
+    return _json_bytes_response(catalog.product_json([pos])[0])
 
 # Cart endpoints
 
 
+@app.get("/api/products/{product_id}/alternatives")
+def get_greener_alternatives(request: Request, product_id: int, k: int = 5):
+    """The k most similar products in the same category with a higher EarthScore"""
+    pos = catalog.position_of(product_id)
+    if pos is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    not_modified = _not_modified(request)
+    if not_modified:
+        return not_modified
+
+    positions = catalog.greener_alternatives(pos, k=max(k, 0))
+    body = (b'{"product":' + catalog.product_json([pos])[0]
+            + b',"alternatives":' + catalog.json_array(positions)
+            + b',"count":' + str(len(positions)).encode() + b'}')
+    return _json_bytes_response(body)
+
+
 @app.get("/api/cart/{user_id}")
 def get_cart(user_id: str):
     """Get user's cart"""
@@ -139,11 +345,10 @@ def get_cart(user_id: str):
 @app.post("/api/cart/{user_id}/add")
 def add_to_cart_api(user_id: str, product_id: int, quantity: int = 1):
     """Add item to cart via API"""
-    product = products_df[products_df['product_id'] == product_id]
-    if product.empty:
+    product_data = catalog.get_product(product_id)
+    if product_data is None:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    product_data = product.iloc[0]
     result = cart_service.add_to_cart(
         user_id=user_id,
         product_id=product_id,
@@ -230,6 +435,31 @@ class ChatRequest(BaseModel):
     user_id: str
 
 
+def _chat_products(product_ids: List[int]) -> List[Dict]:
+    """Product cards for a chat reply, looked up by id"""
+    positions = [pos for pos in map(catalog.position_of, product_ids) if pos is not None]
+    products_data = []
+    for _, product in catalog.df.iloc[positions].iterrows():
+        products_data.append({
+            "product_id": int(product.get('product_id', 0)),
+            "product_name": product['product_name'],
+            "price": float(product['price']),
+            "earth_score": int(product.get('earth_score', 75)),
+            "category": product.get('category', 'home'),
+            "image_url": f"/images/{product.get('category', 'home').lower()}.png",
+            # Additional fields for detail view
+            "manufacturing_emissions_gco2e": float(product.get('manufacturing_emissions_gco2e', 2000)),
+            "transport_distance_km": float(product.get('transport_distance_km', 1000)),
+            "recyclability_percent": int(product.get('recyclability_percent', 80)),
+            "biodegradability_score": int(product.get('biodegradability_score', 4)),
+            "is_fair_trade": bool(product.get('is_fair_trade', False)),
+            "supply_chain_transparency_score": int(product.get('supply_chain_transparency_score', 4)),
+            "durability_rating": int(product.get('durability_rating', 4)),
+            "repairability_index": int(product.get('repairability_index', 4))
+        })
+    return products_data
+
+
 @app.post("/api/chat")
 async def chat_with_agent(request: ChatRequest):
     """Enhanced chat endpoint with multi-agent support and structured product data"""
@@ -242,6 +472,8 @@ async def chat_with_agent(request: ChatRequest):
             "messages": [HumanMessage(content=request.message)],
             "user_info": {"user_id": request.user_id},
             "products_df": products_df,
+            "catalog": catalog,
+            "product_ids": None,
             "current_agent": None,
             "routing_info": None,
             "specialist_agents": {}  # Will be set by agent wrapper
@@ -253,42 +485,8 @@ async def chat_with_agent(request: ChatRequest):
         # Get the response
         agent_response = final_state['messages'][-1].content
 
-        # Extract structured product data if shopping assistant was used
-        products_data = []
-        if final_state.get("current_agent") == "shopping_assistant":
-            # Parse products from the response
-            import re
-            product_pattern = r'- (.*?) - \$([\d.]+) \(EarthScore: (\d+)\)'
-            matches = re.findall(product_pattern, agent_response)
-
-            for match in matches:
-                product_name = match[0]
-                price = float(match[1])
-                earth_score = int(match[2])
-
-                # Find the full product details from products_df
-                product_row = products_df[products_df['product_name'].str.contains(
-                    product_name, case=False, na=False)]
-
-                if not product_row.empty:
-                    product = product_row.iloc[0]
-                    products_data.append({
-                        "product_id": int(product.get('product_id', 0)),
-                        "product_name": product['product_name'],
-                        "price": float(product['price']),
-                        "earth_score": int(product.get('earth_score', 75)),
-                        "category": product.get('category', 'home'),
-                        "image_url": f"/images/{product.get('category', 'home').lower()}.png",
-                        # Additional fields for detail view
-                        "manufacturing_emissions_gco2e": float(product.get('manufacturing_emissions_gco2e', 2000)),
-                        "transport_distance_km": float(product.get('transport_distance_km', 1000)),
-                        "recyclability_percent": int(product.get('recyclability_percent', 80)),
-                        "biodegradability_score": int(product.get('biodegradability_score', 4)),
-                        "is_fair_trade": bool(product.get('is_fair_trade', False)),
-                        "supply_chain_transparency_score": int(product.get('supply_chain_transparency_score', 4)),
-                        "durability_rating": int(product.get('durability_rating', 4)),
-                        "repairability_index": int(product.get('repairability_index', 4))
-                    })
+        # Structured product data from the ids whichever specialist listed
+        products_data = _chat_products(final_state.get("product_ids") or [])
 
         # Include routing info for debugging
         response_data = {
@@ -322,12 +520,49 @@ class ProductFeatures(BaseModel):
 
 @app.post("/api/predict")
 def predict_score(features: ProductFeatures):
-    """Predict EarthScore for product features"""
-    data = pd.DataFrame([features.dict()])
-    data_imputed = imputer.transform(data)
-    prediction = model.predict(data_imputed)
-    score = max(0, min(100, int(prediction[0])))
-    return {"earth_score": score}
+    """
+    Predict EarthScore for product features. "path" is "exact" when all
+    features were given (closed-form engine score), "model" otherwise.
+    """
+    record = features.dict()
+    if predict_batcher is not None:
+        score = predict_batcher.predict(record)
+    else:
+        score = predictor.predict_fast(record)
+    return {"earth_score": score, "path": predictor.path(record)}
+
+
+@app.get("/api/predict/stats")
+def predict_stats():
+    """Micro-batching counters, /api/predict latency percentiles and memo counters"""
+    if predict_batcher is None:
+        return dict(predictor.memo_stats(), batching=False)
+    return dict(predict_batcher.stats(), **predictor.memo_stats(), batching=True)
+
+
+@app.post("/api/predict/batch")
+def predict_scores_batch(products: List[ProductFeatures], batch_size: int = 1000):
+    """
+    Predict EarthScores for many products: complete ones with the engine,
+    the rest with one imputer + model call. Streams NDJSON lines
+    {"index": i, "earth_score": s, "path": "exact" | "model"} in input order.
+    """
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be >= 1")
+    scores, exact = predictor.predict_with_paths(
+        predictor.pack([features.dict() for features in products]))
+    paths = [PATH_EXACT if is_exact else PATH_MODEL for is_exact in exact.tolist()]
+
+    def lines():
+        for start in range(0, len(scores), batch_size):
+            stop = start + batch_size
+            yield "".join(f'{{"index":{index},"earth_score":{score},"path":"{path}"}}\n'
+                          for index, (score, path) in enumerate(zip(scores[start:stop].tolist(),
+                                                                    paths[start:stop]),
+                                                                start)).encode()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"X-Total-Count": str(len(scores))})
 
 # Add this temporary endpoint to main.py to debug
 
@@ -343,6 +578,12 @@ def debug_products():
     }
 
 
+@app.get("/api/debug/filter-cache")
+def debug_filter_cache():
+    """Hit/miss counters of the shared filter result cache"""
+    return filter_service.cache.stats()
+
+
 @app.post("/api/checkout/optimize")
 async def optimize_checkout(request: dict):
     # For now, return mock data
@@ -1,3 +1,10 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import hashlib
+import json
+import os
+
+import numpy as np
 import pandas as pd
 
 # Define the weights for each category based on the presentation
@@ -21,6 +28,19 @@ NORM_RANGES = {
     "repairability_index": (1, 5),
 }
 
+# Column order expected by the batch engine (and by the ML model)
+FEATURES = list(NORM_RANGES)
+
+# Features where a lower raw value is better
+INVERTED_FEATURES = ["manufacturing_emissions_gco2e", "transport_distance_km"]
+
+
+def scoring_fingerprint() -> str:
+    """Short hash of WEIGHTS and NORM_RANGES; changes whenever the scoring rules do."""
+    rules = json.dumps({"weights": WEIGHTS, "norm_ranges": NORM_RANGES,
+                        "inverted": INVERTED_FEATURES}, sort_keys=True)
+    return hashlib.sha1(rules.encode()).hexdigest()[:16]
+
 
 def normalize(value, feature_name):
     """Normalizes a feature's value to a 0-1 scale (0 is worst, 1 is best)."""
@@ -30,7 +50,7 @@ def normalize(value, feature_name):
     value = max(min_val, min(value, max_val))
 
     # Standard normalization for features where higher is better
-    if feature_name not in ["manufacturing_emissions_gco2e", "transport_distance_km"]:
+    if feature_name not in INVERTED_FEATURES:
         return (value - min_val) / (max_val - min_val)
     else:
         # Inverted normalization for features where lower is better (like emissions)
@@ -80,6 +100,134 @@ def calculate_earth_score(product: pd.Series) -> int:
     return int(final_score * 100)
 
 
+def normalize_features(features) -> np.ndarray:
+    """
+    Vectorized version of `normalize` for a whole feature matrix.
+    Accepts a DataFrame with the FEATURES columns or an (n, 8) array in
+    FEATURES order and returns an (n, 8) float64 array on a 0-1 scale.
+    """
+    if isinstance(features, pd.DataFrame):
+        values = features[FEATURES].to_numpy(dtype=np.float64)
+    else:
+        values = np.array(features, dtype=np.float64, ndmin=2)
+        if values.shape[1] != len(FEATURES):
+            raise ValueError(
+                f"Expected {len(FEATURES)} feature columns, got {values.shape[1]}")
+
+    mins = np.array([NORM_RANGES[f][0] for f in FEATURES], dtype=np.float64)
+    maxs = np.array([NORM_RANGES[f][1] for f in FEATURES], dtype=np.float64)
+
+    # Same bounds check as `normalize`; NaN ends up at the minimum there too
+    clipped = np.clip(values, mins, maxs)
+    clipped = np.where(np.isnan(values), mins, clipped)
+
+    normalized = (clipped - mins) / (maxs - mins)
+    inverted = [FEATURES.index(f) for f in INVERTED_FEATURES]
+    normalized[:, inverted] = 1 - normalized[:, inverted]
+    return normalized
+
+
+def calculate_earth_scores(features) -> np.ndarray:
+    """
+    Calculates the EarthScore for many products at once.
+    Accepts a DataFrame or an (n, 8) array (see `normalize_features`) and
+    returns an int64 array with the same values `calculate_earth_score`
+    gives for each row.
+    """
+    norm = normalize_features(features)
+
+    # Same operation order as the scalar version so results match exactly
+    carbon_score = (norm[:, 0] + norm[:, 1]) / 2
+    materials_score = (norm[:, 2] + norm[:, 3]) / 2
+    ethical_score = (norm[:, 4] + norm[:, 5]) / 2
+    longevity_score = (norm[:, 6] + norm[:, 7]) / 2
+
+    final_score = (
+        carbon_score * WEIGHTS["carbon_footprint"] +
+        materials_score * WEIGHTS["materials_packaging"] +
+        ethical_score * WEIGHTS["ethical_sourcing"] +
+        longevity_score * WEIGHTS["product_longevity"]
+    )
+
+    return np.trunc(final_score * 100).astype(np.int64)
+
+
+# Below this many rows per worker, process start-up costs more than it saves
+MIN_ROWS_PER_WORKER = 50_000
+
+
+def effective_workers(n_rows: int, workers: int = None) -> int:
+    """Processes `calculate_earth_scores_parallel` actually uses for n_rows"""
+    workers = workers or os.cpu_count() or 1
+    return max(1, min(workers, n_rows // MIN_ROWS_PER_WORKER))
+
+
+def _score_shared_range(input_name: str, output_name: str, n_rows: int, start: int, stop: int):
+    """Worker: score rows [start, stop) of the shared feature matrix in place."""
+    input_shm = shared_memory.SharedMemory(name=input_name)
+    output_shm = shared_memory.SharedMemory(name=output_name)
+    try:
+        features = np.ndarray((n_rows, len(FEATURES)), dtype=np.float64, buffer=input_shm.buf)
+        scores = np.ndarray((n_rows,), dtype=np.int64, buffer=output_shm.buf)
+        scores[start:stop] = calculate_earth_scores(features[start:stop])
+        del features, scores
+    finally:
+        input_shm.close()
+        output_shm.close()
+    return stop - start
+
+
+def calculate_earth_scores_parallel(features, workers: int = None,
+                                    executor: ProcessPoolExecutor = None,
+                                    return_workers: bool = False):
+    """
+    Multi-process version of `calculate_earth_scores`.
+    The feature matrix is copied once into shared memory and each worker
+    scores a contiguous row range, writing into a shared output array, so
+    the result order is the input order. Pass an existing `executor` to
+    reuse its processes across calls (e.g. when scoring chunks).
+
+    Each worker gets at least MIN_ROWS_PER_WORKER rows, so fewer than
+    `workers` processes (one, for small inputs) may run; with
+    return_workers=True the result is (scores, processes used).
+    """
+    if isinstance(features, pd.DataFrame):
+        values = features[FEATURES].to_numpy(dtype=np.float64)
+    else:
+        values = np.array(features, dtype=np.float64, ndmin=2)
+
+    n_rows = len(values)
+    workers = effective_workers(n_rows, workers)
+    if workers == 1:
+        scores = calculate_earth_scores(values)
+        return (scores, workers) if return_workers else scores
+
+    input_shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+    output_shm = shared_memory.SharedMemory(create=True, size=n_rows * np.dtype(np.int64).itemsize)
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        np.ndarray(values.shape, dtype=np.float64, buffer=input_shm.buf)[:] = values
+        bounds = np.linspace(0, n_rows, workers + 1).astype(int)
+        futures = [
+            executor.submit(_score_shared_range, input_shm.name, output_shm.name,
+                            n_rows, int(start), int(stop))
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        for future in futures:
+            future.result()
+        scores = np.ndarray((n_rows,), dtype=np.int64, buffer=output_shm.buf).copy()
+        return (scores, workers) if return_workers else scores
+    finally:
+        if own_executor:
+            executor.shutdown()
+        input_shm.close()
+        input_shm.unlink()
+        output_shm.close()
+        output_shm.unlink()
+
+
 # This block allows us to test the engine directly by running "python ml/engine.py"
 if __name__ == "__main__":
     print("Running EarthScore Engine Test...")
@@ -93,8 +241,7 @@ if __name__ == "__main__":
         exit()
 
     # Calculate EarthScore for each product
-    products_df["earth_score"] = products_df.apply(
-        calculate_earth_score, axis=1)
+    products_df["earth_score"] = calculate_earth_scores(products_df)
 
     # Display the results, sorted by the new score
     print("\n--- Product EarthScores ---")
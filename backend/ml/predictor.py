@@ -0,0 +1,322 @@
+# ml/predictor.py
+"""
+EarthScore prediction for one product or a whole batch at once, plus a
+micro-batcher that merges concurrent single-product requests into shared
+model calls and a DataFrame-free single-product fast path with a memo.
+
+The model only imitates ml.engine's closed-form score, so products with all
+eight features are scored exactly by the engine ("exact" path); the
+imputer + XGBoost model fills in for products with missing features
+("model" path). With exported trees (ml.tree_export) the model path runs
+small batches in NumPy and only loads the native model for large ones.
+"""
+import os
+import pickle
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ml.engine import FEATURES, calculate_earth_score, calculate_earth_scores
+
+PATH_EXACT = "exact"
+PATH_MODEL = "model"
+
+
+class EarthScorePredictor:
+    # Repeated single inputs are memoized on their feature values rounded to
+    # MEMO_DECIMALS places (effectively exact for real inputs)
+    MEMO_SIZE = 4096
+    MEMO_DECIMALS = 6
+    # Largest model batch for the NumPy trees; the native model wins above
+    TREES_MAX_ROWS = 32
+
+    def __init__(self, imputer, model=None, memo_size: int = MEMO_SIZE, exact: bool = True,
+                 trees=None, model_path: Optional[str] = None):
+        """
+        model:      the fitted XGBRegressor, or None to unpickle it from
+                    model_path on first use
+        trees:      an ml.tree_export.TreeEnsemble of the same model, for
+                    single products and small batches
+        """
+        if model is None and trees is None and model_path is None:
+            raise ValueError("Need a model, exported trees or a model path")
+        self.imputer = imputer
+        self.trees = trees
+        self.model_path = model_path
+        self._model = model
+        self._model_lock = threading.Lock()
+        # Score complete feature sets with the engine instead of the model
+        self.exact = exact
+        # Column order the models were trained with
+        self.features = list(getattr(imputer, "feature_names_in_", FEATURES))
+
+        # Fast path: impute from the stored statistics, then the trees or the
+        # booster in place, when the imputer is a plain per-column fill
+        statistics = getattr(imputer, "statistics_", None)
+        self._fill = None
+        if (statistics is not None and not getattr(imputer, "add_indicator", False)
+                and np.isfinite(statistics).all()):
+            self._fill = np.asarray(statistics, dtype=np.float64).reshape(1, -1)
+        self._booster = None
+        self._iteration_range = (0, 0)
+        self._local = threading.local()
+
+        self.memo_size = memo_size
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self._memo: "OrderedDict[tuple, int]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The native model, unpickled from model_path on first use"""
+        if self._model is None and self.model_path is not None:
+            with self._model_lock:
+                if self._model is None:
+                    with open(self.model_path, 'rb') as f:
+                        self._model = pickle.load(f)
+        return self._model
+
+    def _booster_predict(self, row: np.ndarray) -> float:
+        """Native prediction for one imputed (1, 8) row, in place on the booster"""
+        if self._booster is None:
+            best_iteration = getattr(self.model, "best_iteration", None)
+            self._iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+            self._booster = self.model.get_booster()
+        return float(self._booster.inplace_predict(row, iteration_range=self._iteration_range)[0])
+
+    def pack(self, records: Iterable[Dict[str, Any]]) -> np.ndarray:
+        """Feature records -> one contiguous (n, 8) float64 array, NaN where missing"""
+        rows = [[np.nan if record.get(feature) is None else record[feature]
+                 for feature in self.features] for record in records]
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(self.features))
+
+    def is_complete(self, record: Dict[str, Any]) -> bool:
+        """Whether all features are present (not None or NaN)"""
+        for feature in self.features:
+            value = record.get(feature)
+            if value is None or value != value:
+                return False
+        return True
+
+    def path(self, record: Dict[str, Any]) -> str:
+        """Which path scores this record: PATH_EXACT or PATH_MODEL"""
+        return PATH_EXACT if self.exact and self.is_complete(record) else PATH_MODEL
+
+    def predict_model(self, features: np.ndarray) -> np.ndarray:
+        """Imputer + model EarthScores for an (n, 8) feature array, one model call"""
+        if not len(features):
+            return np.empty(0, dtype=np.int64)
+        # The imputer was fit on a DataFrame; wrapping the array does not copy it
+        frame = pd.DataFrame(features, columns=self.features, copy=False)
+        imputed = self.imputer.transform(frame)
+        if self.trees is not None and (len(imputed) <= self.TREES_MAX_ROWS or self.model is None):
+            predictions = self.trees.predict(imputed)
+        else:
+            predictions = self.model.predict(imputed)
+        # Same as max(0, min(100, int(prediction))) per product
+        return np.clip(np.trunc(predictions), 0, 100).astype(np.int64)
+
+    def predict_with_paths(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (EarthScores, exact mask) for an (n, 8) feature array: complete rows
+        through the engine, the rest through one model call
+        """
+        exact = ~np.isnan(features).any(axis=1) if self.exact else np.zeros(len(features), dtype=bool)
+        if not exact.any():
+            return self.predict_model(features), exact
+        scores = np.empty(len(features), dtype=np.int64)
+        # The engine takes columns in FEATURES order; the model's may differ
+        columns = [self.features.index(feature) for feature in FEATURES]
+        scores[exact] = calculate_earth_scores(features[exact][:, columns])
+        if not exact.all():
+            scores[~exact] = self.predict_model(features[~exact])
+        return scores, exact
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """EarthScores (int, 0-100) for an (n, 8) feature array"""
+        return self.predict_with_paths(features)[0]
+
+    def predict_records(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        return self.predict(self.pack(records))
+
+    def predict_one(self, record: Dict[str, Any]) -> int:
+        return int(self.predict(self.pack([record]))[0])
+
+    def memo_key(self, record: Dict[str, Any]) -> tuple:
+        return tuple(None if record.get(feature) is None
+                     else round(float(record[feature]), self.MEMO_DECIMALS)
+                     for feature in self.features)
+
+    def memo_get(self, key: tuple) -> Optional[int]:
+        with self._memo_lock:
+            score = self._memo.get(key)
+            if score is None:
+                self.memo_misses += 1
+                return None
+            self._memo.move_to_end(key)
+            self.memo_hits += 1
+            return score
+
+    def memo_put(self, key: tuple, score: int):
+        with self._memo_lock:
+            self._memo[key] = score
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+    def memo_stats(self) -> Dict[str, Any]:
+        with self._memo_lock:
+            return {"memo_size": len(self._memo), "memo_hits": self.memo_hits,
+                    "memo_misses": self.memo_misses}
+
+    def _row(self) -> np.ndarray:
+        """This thread's preallocated (1, 8) input row"""
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = self._local.row = np.empty((1, len(self.features)), dtype=np.float64)
+        return row
+
+    def predict_fast(self, record: Dict[str, Any]) -> int:
+        """
+        One product without DataFrames: the engine when all features are
+        present, else a memo lookup, then fill a reused row, impute from the
+        imputer's statistics and run the trees (or the booster in place).
+        Same score as predict_one.
+        """
+        if self.exact and self.is_complete(record):
+            return calculate_earth_score(record)
+        key = self.memo_key(record)
+        score = self.memo_get(key)
+        if score is None:
+            score = self.predict_unmemoized(record)
+            self.memo_put(key, score)
+        return score
+
+    def predict_unmemoized(self, record: Dict[str, Any]) -> int:
+        """predict_fast without the memo"""
+        if self.exact and self.is_complete(record):
+            return calculate_earth_score(record)
+        if self._fill is None or (self.trees is None and not hasattr(self.model, "get_booster")):
+            return self.predict_one(record)
+        row = self._row()
+        for i, feature in enumerate(self.features):
+            value = record.get(feature)
+            row[0, i] = np.nan if value is None else value
+        np.copyto(row, self._fill, where=np.isnan(row))
+        if self.trees is not None:
+            prediction = float(self.trees.predict(row)[0])
+        else:
+            prediction = self._booster_predict(row)
+        return int(min(100, max(0, int(prediction))))
+
+
+class PredictionBatcher:
+    """
+    Collects single-product predictions arriving within `window_ms` of each
+    other (up to `max_batch` of them) into one predictor call, then hands
+    each caller its own score. Latency per request (submit to result) is
+    kept for the last `latency_samples` requests.
+    """
+
+    def __init__(self, predictor: EarthScorePredictor,
+                 window_ms: Optional[float] = None,
+                 max_batch: Optional[int] = None,
+                 latency_samples: int = 10_000):
+        self.predictor = predictor
+        self.window_ms = (float(os.getenv("PREDICT_BATCH_WINDOW_MS", "2"))
+                          if window_ms is None else window_ms)
+        self.max_batch = (int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+                          if max_batch is None else max_batch)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._latencies = deque(maxlen=latency_samples)
+        self._batches = 0
+        self._requests = 0
+        self._stats_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, record: Dict[str, Any]) -> Future:
+        """Queue one feature record; the future resolves to its EarthScore"""
+        future: Future = Future()
+        # Exact scores are cheaper than a queue round trip
+        if self.predictor.path(record) == PATH_EXACT:
+            future.set_result(self.predictor.predict_fast(record))
+            return future
+        score = self.predictor.memo_get(self.predictor.memo_key(record))
+        if score is not None:
+            future.set_result(score)
+        else:
+            self._queue.put((record, future, time.perf_counter()))
+        return future
+
+    def predict(self, record: Dict[str, Any], timeout: Optional[float] = 10.0) -> int:
+        return self.submit(record).result(timeout=timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self, first) -> list:
+        """The first item plus whatever else arrives within the window"""
+        batch = [first]
+        deadline = time.perf_counter() + self.window_ms / 1000
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            try:
+                if len(batch) == 1:
+                    scores = [self.predictor.predict_unmemoized(batch[0][0])]
+                else:
+                    scores = self.predictor.predict_records([record for record, _, _ in batch]).tolist()
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            for (record, future, submitted), score in zip(batch, scores):
+                self.predictor.memo_put(self.predictor.memo_key(record), score)
+                future.set_result(score)
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._latencies.extend(done - submitted for _, _, submitted in batch)
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch counts and request latency percentiles (ms)"""
+        with self._stats_lock:
+            latencies = np.array(self._latencies) * 1000
+            batches, requests = self._batches, self._requests
+        result = {
+            "window_ms": self.window_ms,
+            "max_batch": self.max_batch,
+            "requests": requests,
+            "batches": batches,
+            "mean_batch_size": round(requests / batches, 2) if batches else 0.0,
+        }
+        for p in (50, 95, 99):
+            result[f"p{p}_ms"] = round(float(np.percentile(latencies, p)), 3) if len(latencies) else None
+        return result
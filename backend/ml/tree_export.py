@@ -0,0 +1,228 @@
+# ml/tree_export.py
+"""
+The trained XGBoost booster as flat NumPy arrays, and a pure-NumPy
+evaluator for them, so serving does not need to import xgboost.
+
+The export has one slot per node of every tree: split feature, threshold,
+left/right child (leaves point to themselves), leaf value and the default
+direction for a missing value. Loading compiles the trees into complete
+binary trees of the deepest tree's depth, so a batch walks all trees at
+once, one level per step, with child positions computed rather than looked
+up.
+
+NumPy overhead is small but each step is a few gathers over (rows x trees),
+so the evaluator beats the native library on small batches and loses on
+large ones (see scripts/benchmark_trees.py).
+
+Export once after training (python -m ml.tree_export, from backend/):
+the .npz records the SHA-1 of the model.pkl it came from, so a stale
+export is ignored.
+"""
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, Optional
+
+import numpy as np
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "model.pkl")
+TREES_PATH = os.path.join(os.path.dirname(__file__), "model_trees.npz")
+
+# Rows evaluated per step; bounds the (rows x trees) index arrays
+CHUNK_ROWS = 8192
+
+
+def file_sha1(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _base_score(value) -> float:
+    # XGBoost >= 3 stores it as a one-element vector, e.g. "[5.611875E1]"
+    return float(str(value).strip("[]"))
+
+
+def export_booster(model) -> Dict[str, np.ndarray]:
+    """
+    Flat arrays for an XGBRegressor or Booster (gbtree, reg:squarederror,
+    numerical splits). Honours best_iteration when the model has one.
+    """
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+
+    objective = learner["objective"]["name"]
+    if objective != "reg:squarederror":
+        raise ValueError(f"Unsupported objective {objective!r}; expected reg:squarederror")
+    booster_name = learner["gradient_booster"]["name"]
+    if booster_name != "gbtree":
+        raise ValueError(f"Unsupported booster {booster_name!r}; expected gbtree")
+
+    trees = learner["gradient_booster"]["model"]["trees"]
+    best_iteration = getattr(model, "best_iteration", None)
+    if best_iteration is not None:
+        trees = trees[:best_iteration + 1]
+
+    feature, threshold, left, right, value, default_left, roots = [], [], [], [], [], [], []
+    depth = 0
+    offset = 0
+    for tree in trees:
+        if any(tree["split_type"]):
+            raise ValueError("Categorical splits are not supported")
+        tree_left = np.array(tree["left_children"], dtype=np.int32)
+        tree_right = np.array(tree["right_children"], dtype=np.int32)
+        n_nodes = len(tree_left)
+        nodes = np.arange(n_nodes, dtype=np.int32)
+        leaf = tree_left == -1
+
+        # Leaves loop back to themselves; leaf values live in split_conditions
+        conditions = np.array(tree["split_conditions"], dtype=np.float32)
+        feature.append(np.where(leaf, 0, tree["split_indices"]).astype(np.int32))
+        threshold.append(np.where(leaf, np.float32(np.inf), conditions).astype(np.float32))
+        value.append(np.where(leaf, conditions, 0).astype(np.float32))
+        left.append(np.where(leaf, nodes, tree_left) + offset)
+        right.append(np.where(leaf, nodes, tree_right) + offset)
+        default_left.append(np.array(tree["default_left"], dtype=bool))
+        roots.append(offset)
+
+        # Depth from the parent links (parents come before children)
+        node_depth = np.zeros(n_nodes, dtype=np.int32)
+        for node in range(1, n_nodes):
+            node_depth[node] = node_depth[tree["parents"][node]] + 1
+        depth = max(depth, int(node_depth.max(initial=0)))
+        offset += n_nodes
+
+    def joined(parts, dtype):
+        return np.concatenate(parts).astype(dtype) if parts else np.empty(0, dtype=dtype)
+
+    return {
+        "feature": joined(feature, np.int32),
+        "threshold": joined(threshold, np.float32),
+        "left": joined(left, np.int32),
+        "right": joined(right, np.int32),
+        "value": joined(value, np.float32),
+        "default_left": joined(default_left, bool),
+        "roots": np.array(roots, dtype=np.int32),
+        "depth": np.int32(depth),
+        "base_score": np.float32(_base_score(learner["learner_model_param"]["base_score"])),
+        "num_features": np.int32(int(learner["learner_model_param"]["num_feature"])),
+    }
+
+
+class TreeEnsemble:
+    # The dense layout has 2^depth leaves per tree
+    MAX_DEPTH = 12
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """Compile exported node arrays into one complete binary tree per tree"""
+        self.arrays = {name: np.asarray(values) for name, values in arrays.items()
+                       if name != "source_sha1"}
+        self.source_sha1 = str(arrays.get("source_sha1", ""))
+        self.depth = int(arrays["depth"])
+        self.base_score = np.float32(arrays["base_score"])
+        self.num_features = int(arrays["num_features"])
+        if self.depth > self.MAX_DEPTH:
+            raise ValueError(f"Trees of depth {self.depth} exceed MAX_DEPTH {self.MAX_DEPTH}")
+
+        # Position p's children are 2p + 1 (left) and 2p + 2 (right), so the
+        # walk needs no child lookups. Under a leaf every split goes left and
+        # every leaf slot holds the leaf's value, so any path there ends on it.
+        feature, threshold = arrays["feature"], arrays["threshold"]
+        left, right = arrays["left"], arrays["right"]
+        value, default_left = arrays["value"], arrays["default_left"]
+        n_trees, n_splits = len(arrays["roots"]), 2 ** self.depth - 1
+        self._feature = np.zeros((n_trees, n_splits), dtype=np.intp)
+        self._threshold = np.full((n_trees, n_splits), np.inf, dtype=np.float32)
+        self._default_left = np.ones((n_trees, n_splits), dtype=bool)
+        self._leaf_value = np.zeros((n_trees, n_splits + 1), dtype=np.float32)
+        for tree, root in enumerate(arrays["roots"]):
+            stack = [(int(root), 0, 0)]
+            while stack:
+                node, position, depth = stack.pop()
+                if left[node] == node:
+                    first = last = position
+                    for _ in range(self.depth - depth):
+                        first, last = 2 * first + 1, 2 * last + 2
+                    self._leaf_value[tree, first - n_splits:last - n_splits + 1] = value[node]
+                    continue
+                self._feature[tree, position] = feature[node]
+                self._threshold[tree, position] = threshold[node]
+                self._default_left[tree, position] = default_left[node]
+                stack.append((int(left[node]), 2 * position + 1, depth + 1))
+                stack.append((int(right[node]), 2 * position + 2, depth + 1))
+
+        # Flat views plus each tree's offset into them, for single gathers
+        self._feature = self._feature.ravel()
+        self._threshold = self._threshold.ravel()
+        self._default_left = self._default_left.ravel()
+        self._leaf_value = self._leaf_value.ravel()
+        self._split_offset = (np.arange(n_trees) * n_splits)[:, None]
+        self._leaf_offset = (np.arange(n_trees) * (n_splits + 1) - n_splits)[:, None]
+
+    def __len__(self) -> int:
+        return len(self._split_offset)
+
+    @classmethod
+    def from_model(cls, model) -> "TreeEnsemble":
+        return cls(export_booster(model))
+
+    @classmethod
+    def load(cls, path: str = TREES_PATH) -> "TreeEnsemble":
+        with np.load(path) as arrays:
+            return cls(dict(arrays))
+
+    def save(self, path: str = TREES_PATH, source_sha1: str = ""):
+        np.savez(path, source_sha1=np.str_(source_sha1), **self.arrays)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Predictions (float32) for an (n, num_features) array, NaN = missing"""
+        # XGBoost compares float32 feature values against float32 thresholds
+        features = np.asarray(features, dtype=np.float32).reshape(-1, self.num_features)
+        result = np.empty(len(features), dtype=np.float32)
+        for start in range(0, len(features), CHUNK_ROWS):
+            chunk = features[start:start + CHUNK_ROWS]
+            flat = chunk.ravel()
+            row_offset = np.arange(len(chunk)) * self.num_features
+
+            # (trees x rows) positions, all trees advancing one level per step
+            position = np.zeros((len(self), len(chunk)), dtype=np.intp)
+            for _ in range(self.depth):
+                split = position + self._split_offset
+                x = flat[self._feature[split] + row_offset]
+                # NaN compares False, so missing values go left only by default
+                go_left = (x < self._threshold[split]) | (np.isnan(x) & self._default_left[split])
+                position = 2 * position + 2 - go_left
+
+            # XGBoost adds leaf values to the base score one tree at a time, in
+            # float32; a cumulative sum in the same order gives identical bits
+            leaves = np.empty((len(self) + 1, len(chunk)), dtype=np.float32)
+            leaves[0] = self.base_score
+            leaves[1:] = self._leaf_value[position + self._leaf_offset]
+            result[start:start + CHUNK_ROWS] = np.cumsum(leaves, axis=0)[-1]
+        return result
+
+
+def load_trees(path: str = TREES_PATH, model_path: str = MODEL_PATH) -> Optional[TreeEnsemble]:
+    """The exported ensemble, or None when missing or exported from another model.pkl"""
+    if not os.path.exists(path) or not os.path.exists(model_path):
+        return None
+    trees = TreeEnsemble.load(path)
+    return trees if trees.source_sha1 == file_sha1(model_path) else None
+
+
+def export_model_file(model_path: str = MODEL_PATH, path: str = TREES_PATH) -> TreeEnsemble:
+    """Unpickle model.pkl, export its trees to `path` and return them"""
+    import pickle
+
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    trees = TreeEnsemble.from_model(model)
+    trees.save(path, source_sha1=file_sha1(model_path))
+    return trees
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    trees = export_model_file(*args)
+    print(f"Exported {len(trees)} trees ({len(trees.arrays['feature'])} nodes, depth {trees.depth}) "
+          f"to {args[1] if len(args) > 1 else TREES_PATH}")
@@ -0,0 +1,86 @@
+# services/alternatives_service.py
+"""
+Greener alternatives: the products nearest to a given one in sustainability
+feature space that have a higher EarthScore.
+
+Each product is a point of the eight normalized EarthScore features
+(ml.engine.NORM_RANGES, 0-1 with "higher is better") plus a log-scaled
+price dimension. One KD-tree per category answers nearest-neighbour
+queries; the search widens until enough higher-scoring neighbours appear.
+"""
+import re
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+from ml.engine import normalize_features
+
+# Explicit requests only: "alternatives to X", "similar to X", "replacement
+# for X", "substitute for X", "instead of X". The text after them names the
+# product; "similar products in kitchen" is a search, not a request.
+_ALTERNATIVES_REQUEST = re.compile(
+    r"\b(?:(?:alternatives?|replacements?|substitutes?)\s+(?:to|for)"
+    r"|similar\s+to|instead\s+of)\s+(?P<product>.+)",
+    re.IGNORECASE)
+_TRAILING_CLAUSE = re.compile(r"\s+(?:but|that|which|with)\b|,", re.IGNORECASE)
+
+
+def parse_alternatives_request(message: str) -> Optional[str]:
+    """
+    The product reference in an explicit alternatives request, or None.
+    Callers still need it to resolve to a product (ProductCatalog.resolve_product).
+    """
+    match = _ALTERNATIVES_REQUEST.search(message)
+    if not match:
+        return None
+    # "similar to X but scores higher" -> "X"
+    product = _TRAILING_CLAUSE.split(match.group("product"))[0].strip(" ?.!'\"")
+    return product or None
+
+
+class AlternativesIndex:
+    # Price adds one dimension with the same 0-1 range as the features
+    PRICE_WEIGHT = 1.0
+
+    def __init__(self, products_df: pd.DataFrame, leaf_size: int = 40):
+        """Build one KD-tree per category over the feature + price vectors"""
+        self._earth_scores = products_df['earth_score'].to_numpy()
+
+        points = normalize_features(products_df)
+        if 'price' in products_df.columns:
+            log_price = np.log1p(products_df['price'].to_numpy(dtype=np.float64))
+            log_price = np.nan_to_num(log_price, nan=np.nanmedian(log_price) if len(log_price) else 0)
+            span = log_price.max() - log_price.min() if len(log_price) else 0
+            price = (log_price - log_price.min()) / span if span else np.zeros(len(log_price))
+            points = np.column_stack([points, self.PRICE_WEIGHT * price])
+        self._points = np.ascontiguousarray(points)
+
+        codes, _ = pd.factorize(products_df['category'].astype(str).str.lower())
+        self._category_codes = codes
+        self._trees = {}
+        for code in np.unique(codes):
+            rows = np.flatnonzero(codes == code)
+            self._trees[code] = (rows, KDTree(self._points[rows], leaf_size=leaf_size))
+
+    def greener_alternatives(self, pos: int, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (row positions, distances) of the k nearest products in the same
+        category with a higher EarthScore, nearest first
+        """
+        rows, tree = self._trees[self._category_codes[pos]]
+        own_score = self._earth_scores[pos]
+        # Nothing in the category can beat the best score
+        if k <= 0 or not (self._earth_scores[rows] > own_score).any():
+            return rows[:0], np.empty(0)
+
+        query = self._points[pos:pos + 1]
+        fetch = min(len(rows), 4 * k + 1)
+        while True:
+            distances, neighbours = tree.query(query, k=fetch)
+            found = rows[neighbours[0]]
+            better = self._earth_scores[found] > own_score
+            if better.sum() >= k or fetch == len(rows):
+                return found[better][:k], distances[0][better][:k]
+            fetch = min(len(rows), fetch * 4)
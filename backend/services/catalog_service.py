@@ -0,0 +1,282 @@
+# services/catalog_service.py
+"""
+Product catalog with lookup indexes, built once when the catalog is loaded.
+"""
+import hashlib
+import json
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.alternatives_service import AlternativesIndex
+from services.facet_index import FacetIndex
+from services.filter_service import ProductFilterService
+from services.search_index import InvertedIndex, TrigramIndex, tokenize
+from services.suggest_index import SuggestTrie
+from services.vector_index import VectorIndex
+
+_WHITESPACE = re.compile(r"\s+")
+_PRODUCT_ID = re.compile(r"^\s*(?:product\s*(?:id)?\s*)?#?\s*(?P<id>\d+)\s*$", re.IGNORECASE)
+
+
+class ProductCatalog:
+    # Strict fuzzy name resolution: every query word must match a name word
+    # at least STRICT_WORD_SIMILARITY alike, averaging STRICT_NAME_SIMILARITY,
+    # and the query must name most of the product (STRICT_NAME_COVERAGE)
+    STRICT_WORD_SIMILARITY = 0.5
+    STRICT_NAME_SIMILARITY = 0.75
+    STRICT_NAME_COVERAGE = 0.75
+
+    def __init__(self, products_df: pd.DataFrame):
+        """Build the lookup indexes for a products dataframe"""
+        self.df = products_df.reset_index(drop=True)
+
+        # product_id -> row position (first occurrence wins, like a mask + iloc[0])
+        self._id_to_pos: Dict[int, int] = {}
+        for pos, product_id in enumerate(self.df['product_id'].tolist()):
+            self._id_to_pos.setdefault(int(product_id), pos)
+
+        # The same mapping as sorted arrays, for resolving many ids at once
+        ids = self.df['product_id'].to_numpy(dtype=np.int64)
+        order = np.argsort(ids, kind='stable')
+        self._sorted_ids = ids[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = self._sorted_ids[1:] != self._sorted_ids[:-1]
+        self._sorted_ids, self._sorted_id_pos = self._sorted_ids[first], order[first]
+
+        # Normalized product name -> row position, plus the names in row order
+        # for substring matching
+        # (vectorized equivalent of normalize_name)
+        self._names = (self.df['product_name'].fillna("").astype(str)
+                       .str.replace(_WHITESPACE.pattern, " ", regex=True)
+                       .str.strip().str.lower().tolist())
+        self._name_to_pos: Dict[str, int] = {}
+        for pos, name in enumerate(self._names):
+            self._name_to_pos.setdefault(name, pos)
+
+        # Character-trigram index over names for typo-tolerant matching
+        self.trigram_index = TrigramIndex(self._names)
+
+        # Token index over name + category, and row positions per category
+        texts = [f"{name} {category}" for name, category in zip(
+            self._names, self.df['category'].astype(str).str.lower().tolist())]
+        self.text_index = InvertedIndex(texts)
+        codes, categories = pd.factorize(self.df['category'].astype(str).str.lower())
+        self._category_positions = {
+            category: np.flatnonzero(codes == code)
+            for code, category in enumerate(categories)
+        }
+        self.earth_scores = (self.df['earth_score'].to_numpy()
+                             if 'earth_score' in self.df.columns else None)
+
+        # Typeahead over name words and categories, greenest products first
+        self.suggest_trie = SuggestTrie(
+            list(self.trigram_index.word_rows()) + list(self._category_positions.items()),
+            self.earth_scores if self.earth_scores is not None else np.zeros(len(self.df)))
+
+        # Hashed TF-IDF word embeddings over the same vocabulary, for
+        # searches whose words do not appear verbatim in product text
+        self.vector_index = VectorIndex(self.text_index, len(self.df))
+
+        # Content hash of the catalog; changes on any reload with different data
+        row_hashes = pd.util.hash_pandas_object(self.df, index=False).to_numpy()
+        digest = hashlib.sha1(",".join(self.df.columns).encode())
+        digest.update(row_hashes.tobytes())
+        self.version = digest.hexdigest()[:16]
+
+        # Shared filter service with its precomputed indexes; its result
+        # cache is keyed by this catalog version
+        self.filter_service = ProductFilterService(self.df, version=self.version)
+
+        # Per-value bitmaps for facet counts (reuses the filter range indexes)
+        self.facet_index = FacetIndex(self.df, self.filter_service.range_indexes)
+
+        # Per-category KD-trees over sustainability features + price
+        self.alternatives_index = (AlternativesIndex(self.df)
+                                   if 'earth_score' in self.df.columns else None)
+
+        # Per-product JSON bytes, encoded on first use for this version
+        self._json_cache: List[Optional[bytes]] = [None] * len(self.df)
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        """Lower-case and collapse whitespace so lookups ignore formatting"""
+        return _WHITESPACE.sub(" ", str(name)).strip().lower()
+
+    def position_of(self, product_id: int) -> Optional[int]:
+        """Row position of a product id, or None"""
+        return self._id_to_pos.get(int(product_id))
+
+    def positions_of(self, product_ids) -> np.ndarray:
+        """
+        Row positions of many product ids in one gather; -1 where an id is
+        unknown (including ids outside int64, which no product can have)
+        """
+        try:
+            ids = np.asarray(product_ids, dtype=np.int64)
+            in_range = np.ones(len(ids), dtype=bool)
+        except OverflowError:
+            info = np.iinfo(np.int64)
+            in_range = np.array([info.min <= int(product_id) <= info.max
+                                 for product_id in product_ids], dtype=bool)
+            ids = np.array([int(product_id) if ok else 0
+                            for product_id, ok in zip(product_ids, in_range.tolist())],
+                           dtype=np.int64)
+        if not len(self._sorted_ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        slots = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        found = (self._sorted_ids[slots] == ids) & in_range
+        return np.where(found, self._sorted_id_pos[slots], -1)
+
+    def get_product(self, product_id: int) -> Optional[pd.Series]:
+        """Row for a product id in O(1), or None"""
+        pos = self.position_of(product_id)
+        return None if pos is None else self.df.iloc[pos]
+
+    def find_by_name(self, product_name: str, fuzzy: bool = False) -> Optional[int]:
+        """
+        Row position for a product name: an exact (normalized,
+        case-insensitive) name, in O(1). With fuzzy=True a near-exact
+        typo also resolves, but only when every query word closely
+        matches a word of the name (see STRICT_* below); anything looser
+        is left to fuzzy_matches() candidates for the user to confirm.
+        """
+        query = self.normalize_name(product_name)
+        if not query:
+            return None
+        pos = self._name_to_pos.get(query)
+        if pos is not None or not fuzzy:
+            return pos
+        matches = self.trigram_index.search(query, k=1,
+                                            min_similarity=self.STRICT_NAME_SIMILARITY,
+                                            word_similarity=self.STRICT_WORD_SIMILARITY,
+                                            require_all=True,
+                                            min_coverage=self.STRICT_NAME_COVERAGE)
+        return matches[0][0] if matches else None
+
+    def names_containing(self, product_name: str) -> np.ndarray:
+        """
+        Sorted row positions whose name contains the text as a phrase
+        ("frictionless models kit"), checked only on rows holding all of
+        its tokens
+        """
+        query = self.normalize_name(product_name)
+        tokens = tokenize(query)
+        if not tokens:
+            return np.empty(0, dtype=np.int64)
+        rows = self.text_index.postings(tokens[0])
+        for token in tokens[1:]:
+            rows = np.intersect1d(rows, self.text_index.postings(token), assume_unique=True)
+        return rows[[query in self._names[row] for row in rows.tolist()]].astype(np.int64)
+
+    def match_name(self, product_name: str, k: int = 3) -> Tuple[Optional[int], List[int]]:
+        """
+        (row position, []) when a name resolves to one product: exactly, by
+        a near-exact typo (find_by_name fuzzy) or as the only name containing
+        it. Otherwise (None, up to k candidate positions) to offer back.
+        """
+        pos = self.find_by_name(product_name, fuzzy=True)
+        if pos is not None:
+            return pos, []
+        containing = self.names_containing(product_name)
+        if len(containing) == 1:
+            return int(containing[0]), []
+        if len(containing):
+            return None, containing[:k].tolist()
+        return None, [pos for pos, _ in self.fuzzy_matches(product_name, k)]
+
+    def resolve_product(self, reference: str) -> Optional[int]:
+        """Row position for a product id ("#12", "product 12") or a near-exact name"""
+        match = _PRODUCT_ID.search(reference)
+        if match:
+            return self.position_of(int(match.group("id")))
+        return self.find_by_name(reference, fuzzy=True)
+
+    def greener_alternatives(self, pos: int, k: int = 5) -> np.ndarray:
+        """Row positions of the k most similar products with a higher EarthScore"""
+        if self.alternatives_index is None:
+            return np.empty(0, dtype=np.int64)
+        return self.alternatives_index.greener_alternatives(pos, k)[0]
+
+    def fuzzy_matches(self, product_name: str, k: int = 5,
+                      min_similarity: float = 0.5) -> List[Tuple[int, float]]:
+        """Top-k (row position, similarity) candidates for a possibly misspelled name"""
+        return self.trigram_index.search(self.normalize_name(product_name), k, min_similarity)
+
+    def category_positions(self, category: str, partial: bool = False) -> np.ndarray:
+        """
+        Sorted row positions in a category (case-insensitive). With partial=True,
+        every category whose name contains the text is included.
+        """
+        category = str(category).lower()
+        if not partial:
+            return self._category_positions.get(category, np.empty(0, dtype=np.int64))
+        matches = [rows for name, rows in self._category_positions.items() if category in name]
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(matches))
+
+    def search_text(self, words: List[str], limit: Optional[int] = 10) -> np.ndarray:
+        """Row positions matching the words, ranked by words matched then EarthScore"""
+        tokens = [token for word in words for token in tokenize(word)]
+        return self.text_index.search(tokens, self.earth_scores, limit)
+
+    def semantic_search(self, query: str, limit: int = 10) -> np.ndarray:
+        """Row positions of products close to the query in meaning, greenest first"""
+        return self.vector_index.search(query, self.earth_scores, limit)
+
+    def check_fields(self, fields: Optional[List[str]]) -> List[str]:
+        """Validate a field projection; None means every column"""
+        if not fields:
+            return list(self.df.columns)
+        unknown = [field for field in fields if field not in self.df.columns]
+        if unknown:
+            raise KeyError(", ".join(unknown))
+        return fields
+
+    def records(self, rows, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Rows (a slice or array of positions) as JSON-ready dicts"""
+        frame = self.df.iloc[rows][self.check_fields(fields)]
+        # NaN is not valid JSON
+        frame = frame.astype(object).where(frame.notna(), None)
+        return frame.to_dict('records')
+
+    def product_json(self, positions) -> List[bytes]:
+        """Cached JSON encoding of each full product row"""
+        positions = np.asarray(positions, dtype=np.int64)
+        missing = [int(pos) for pos in positions if self._json_cache[pos] is None]
+        if missing:
+            for pos, record in zip(missing, self.records(missing)):
+                self._json_cache[pos] = json.dumps(record, separators=(',', ':')).encode()
+        return [self._json_cache[pos] for pos in positions]
+
+    def json_array(self, positions) -> bytes:
+        """JSON array of full products, assembled from the cached fragments"""
+        return b"[" + b",".join(self.product_json(positions)) + b"]"
+
+    def iter_ndjson(self, start: int = 0, stop: Optional[int] = None,
+                    fields: Optional[List[str]] = None,
+                    batch_size: int = 1000) -> Iterator[bytes]:
+        """Encode rows [start, stop) as NDJSON, one batch of lines at a time"""
+        stop = len(self.df) if stop is None else min(stop, len(self.df))
+        for batch_start in range(start, stop, batch_size):
+            batch_stop = min(batch_start + batch_size, stop)
+            if fields is None:
+                lines = self.product_json(range(batch_start, batch_stop))
+            else:
+                lines = [json.dumps(record, separators=(',', ':')).encode()
+                         for record in self.records(slice(batch_start, batch_stop), fields)]
+            yield b"\n".join(lines) + b"\n"
+
+    def record(self, pos: int) -> Dict[str, Any]:
+        """Row as a dict of plain Python values (JSON-serializable)"""
+        product = self.df.iloc[pos].to_dict()
+        for key, value in product.items():
+            if hasattr(value, 'item'):
+                product[key] = value.item()
+        return product
@@ -0,0 +1,129 @@
+# services/catalog_snapshot.py
+"""
+Typed binary snapshot of the product catalog.
+
+The CSV is converted once into a directory of .npy columns (memory-mapped on
+load) plus a meta.json. Low-cardinality text columns such as `category` are
+dictionary-encoded as integer codes. Loading the snapshot skips CSV parsing
+and type inference entirely.
+
+Build it from the backend directory with:
+    python -m services.catalog_snapshot
+"""
+import json
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CSV_PATH = "../data/products_large.csv"
+DEFAULT_SNAPSHOT_DIR = "../data/products_large.snapshot"
+
+# Text columns always stored as codes + dictionary; other text columns are
+# dictionary-encoded too when they have few distinct values
+DICTIONARY_COLUMNS = ["category"]
+MAX_DICTIONARY_RATIO = 0.05
+
+SNAPSHOT_FORMAT = 1
+
+
+def _source_signature(csv_path: str) -> dict:
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def build_snapshot(csv_path: str = DEFAULT_CSV_PATH,
+                   snapshot_dir: str = DEFAULT_SNAPSHOT_DIR) -> dict:
+    """Convert the product CSV into a snapshot directory and return its metadata"""
+    products_df = pd.read_csv(csv_path)
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    columns = []
+    for name in products_df.columns:
+        series = products_df[name]
+        column = {"name": name, "file": f"{len(columns):03d}.npy"}
+        path = os.path.join(snapshot_dir, column["file"])
+
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            column["kind"] = "numeric"
+            np.save(path, series.to_numpy())
+        elif (name in DICTIONARY_COLUMNS
+              or series.nunique() <= MAX_DICTIONARY_RATIO * len(series)):
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            column["kind"] = "dictionary"
+            column["categories"] = [str(value) for value in uniques]
+            np.save(path, codes.astype(np.int32))
+        else:
+            # Fixed-width unicode so the column can be memory-mapped
+            column["kind"] = "text"
+            column["has_nulls"] = bool(series.isna().any())
+            np.save(path, series.fillna("").astype(str).to_numpy(dtype=str))
+        columns.append(column)
+
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "rows": len(products_df),
+        "columns": columns,
+        "source": _source_signature(csv_path),
+    }
+    with open(os.path.join(snapshot_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def load_snapshot(snapshot_dir: str = DEFAULT_SNAPSHOT_DIR,
+                  csv_path: Optional[str] = DEFAULT_CSV_PATH) -> Optional[pd.DataFrame]:
+    """
+    Load a snapshot built by `build_snapshot`.
+    Returns None if there is no snapshot, it uses an older format, or the
+    CSV at `csv_path` has changed since the snapshot was built.
+    """
+    meta_path = os.path.join(snapshot_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        return None
+    if csv_path and os.path.exists(csv_path) and meta["source"] != _source_signature(csv_path):
+        print(f"⚠️ Catalog snapshot in {snapshot_dir} is stale, rebuild it")
+        return None
+
+    data = {}
+    for column in meta["columns"]:
+        values = np.load(os.path.join(snapshot_dir, column["file"]), mmap_mode="r")
+        if column["kind"] == "dictionary":
+            data[column["name"]] = pd.Categorical.from_codes(
+                values, categories=column["categories"])
+        elif column["kind"] == "text":
+            series = pd.Series(values, dtype=object)
+            if column.get("has_nulls"):
+                series = series.replace("", np.nan)
+            data[column["name"]] = series
+        else:
+            data[column["name"]] = values
+    return pd.DataFrame(data)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the binary product catalog snapshot")
+    parser.add_argument("--csv", default=DEFAULT_CSV_PATH)
+    parser.add_argument("--out", default=DEFAULT_SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    meta = build_snapshot(args.csv, args.out)
+    print(f"✅ Snapshot with {meta['rows']} products written to {args.out}")
+
+    # Compare time-to-ready of both load paths
+    start = time.perf_counter()
+    pd.read_csv(args.csv)
+    csv_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    load_snapshot(args.out, args.csv)
+    snapshot_ms = (time.perf_counter() - start) * 1000
+    print(f"CSV load: {csv_ms:.1f} ms, snapshot load: {snapshot_ms:.1f} ms")
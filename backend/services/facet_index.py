@@ -0,0 +1,112 @@
+# services/facet_index.py
+"""
+Facet counts (per category, EarthScore band and price bucket) from bitmaps
+built once when the catalog loads.
+
+Every facet value is a packed bitmap with one bit per product row. The
+active filters are combined into one bitmap, and a facet count is the
+popcount of (value bitmap AND filter bitmap).
+"""
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from services.filter_service import ProductFilterService, RangeIndex
+
+# Set bits per byte value (numpy 1.26 has no bitwise_count)
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+# Inclusive EarthScore bands, matching the 60/80 thresholds used in chat
+EARTH_SCORE_BANDS = [(0, 39), (40, 59), (60, 79), (80, 100)]
+
+# Price bucket edges; bucket i is edges[i] <= price < edges[i + 1]
+PRICE_EDGES = [0, 25, 50, 100, 250, 500]
+
+
+def _price_labels(edges: List[float]) -> List[str]:
+    labels = [f"{low}-{high}" for low, high in zip(edges, edges[1:])]
+    return labels + [f"{edges[-1]}+"]
+
+
+class FacetIndex:
+    def __init__(self, products_df: pd.DataFrame,
+                 range_indexes: Optional[Dict[str, RangeIndex]] = None):
+        """Build one packed bitmap per facet value"""
+        self._n = len(products_df)
+        self._range_indexes = range_indexes or {}
+        # facet -> (value labels, bitmaps stacked as a (values, bytes) matrix)
+        self._facets: Dict[str, Tuple[List[str], np.ndarray]] = {}
+
+        codes, categories = pd.factorize(products_df['category'].astype(str).str.lower())
+        self._add_facet("category", [str(category) for category in categories], codes)
+
+        if 'earth_score' in products_df.columns:
+            scores = products_df['earth_score'].to_numpy()
+            band_codes = np.full(self._n, -1, dtype=np.int64)
+            for code, (low, high) in enumerate(EARTH_SCORE_BANDS):
+                band_codes[(scores >= low) & (scores <= high)] = code
+            self._add_facet("earth_score",
+                            [f"{low}-{high}" for low, high in EARTH_SCORE_BANDS], band_codes)
+
+        if 'price' in products_df.columns:
+            prices = products_df['price'].to_numpy(dtype=np.float64)
+            bucket_codes = np.digitize(prices, PRICE_EDGES) - 1
+            bucket_codes[np.isnan(prices)] = -1
+            self._add_facet("price", _price_labels(PRICE_EDGES), bucket_codes)
+
+        self._category_bitmaps = dict(zip(*self._facets["category"]))
+        self._empty = np.zeros((self._n + 7) // 8, dtype=np.uint8)
+
+    def _add_facet(self, name: str, labels: List[str], codes: np.ndarray):
+        """Bitmaps for value codes 0..len(labels)-1 (negative codes belong to none)"""
+        bitmaps = np.zeros((len(labels), (self._n + 7) // 8), dtype=np.uint8)
+        for code in range(len(labels)):
+            bitmaps[code] = np.packbits(codes == code)
+        self._facets[name] = (labels, bitmaps)
+
+    def _range_bitmap(self, column: str, low=None, high=None) -> np.ndarray:
+        """Bitmap of rows with low <= column <= high, from the column's range index"""
+        mask = np.zeros(self._n, dtype=bool)
+        mask[self._range_indexes[column].rows(low, high)] = True
+        return np.packbits(mask)
+
+    def filter_bitmap(
+        self,
+        category: Union[str, List[str], None] = None,
+        earth_score_min: Optional[int] = None,
+        earth_score_max: Optional[int] = None,
+        price_min: Optional[float] = None,
+        price_max: Optional[float] = None
+    ) -> Optional[np.ndarray]:
+        """AND of the active filters' bitmaps, or None when nothing is filtered"""
+        bitmap = None
+        categories = ProductFilterService.category_names(category)
+        if categories:
+            bitmap = self._empty.copy()
+            for name in categories:
+                bitmap |= self._category_bitmaps.get(name, self._empty)
+        for column, low, high in (("earth_score", earth_score_min, earth_score_max),
+                                  ("price", price_min, price_max)):
+            if low is None and high is None:
+                continue
+            ranged = self._range_bitmap(column, low, high)
+            bitmap = ranged if bitmap is None else bitmap & ranged
+        return bitmap
+
+    def counts(self, **filters) -> Dict:
+        """Total and per-facet-value counts of the rows matching the filters"""
+        bitmap = self.filter_bitmap(**filters)
+        if bitmap is None:
+            total = self._n
+            facets = {name: bitmaps for name, (_, bitmaps) in self._facets.items()}
+        else:
+            total = int(POPCOUNT[bitmap].sum(dtype=np.int64))
+            facets = {name: bitmaps & bitmap for name, (_, bitmaps) in self._facets.items()}
+
+        result = {"total": total, "facets": {}}
+        for name, bitmaps in facets.items():
+            labels = self._facets[name][0]
+            counts = POPCOUNT[bitmaps].sum(axis=1, dtype=np.int64)
+            result["facets"][name] = dict(zip(labels, counts.tolist()))
+        return result
@@ -1,71 +1,351 @@
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Any, Hashable, Tuple, Union
+
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional, Any
+
+from services.query_parser import parse_filter_query
+
+
+class RangeIndex:
+    """Sorted copy of a numeric column; a range query is two binary searches"""
+
+    def __init__(self, values: np.ndarray):
+        self.order = np.argsort(values, kind='stable')
+        self.sorted_values = values[self.order]
+        # NaN sorts last and matches no range, so queries stop before it
+        self._end = int(np.searchsorted(self.sorted_values, np.inf, side='right'))
+
+    def _bounds(self, low=None, high=None):
+        start = 0 if low is None else np.searchsorted(self.sorted_values[:self._end], low, side='left')
+        stop = self._end if high is None else np.searchsorted(self.sorted_values[:self._end], high, side='right')
+        return int(start), int(max(start, stop))
+
+    def count(self, low=None, high=None) -> int:
+        start, stop = self._bounds(low, high)
+        return stop - start
+
+    def rows(self, low=None, high=None) -> np.ndarray:
+        """Row positions with low <= value <= high (in value order)"""
+        start, stop = self._bounds(low, high)
+        return self.order[start:stop]
+
+
+class FilterResultCache:
+    """
+    Bounded LRU cache of filter results (row positions), shared by every
+    request. Entries belong to one catalog version; a lookup with a
+    different version empties the cache first.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version: Optional[str]):
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def get(self, version: Optional[str], key: Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            self._check_version(version)
+            positions = self._entries.get(key)
+            if positions is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return positions
+
+    def put(self, version: Optional[str], key: Hashable, positions: np.ndarray):
+        positions.setflags(write=False)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = positions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared by all filter services; catalog reloads invalidate it by version
+filter_result_cache = FilterResultCache()
 
 
 class ProductFilterService:
-    def __init__(self, products_df: pd.DataFrame):
-        """Initialize with products dataframe"""
+    # Rows examined per step when walking a presorted order
+    WALK_BLOCK = 1024
+
+    # Numeric columns with a range index
+    RANGE_COLUMNS = ("earth_score", "price")
+
+    def __init__(self, products_df: pd.DataFrame, version: Optional[str] = None,
+                 cache: Optional[FilterResultCache] = None):
+        """
+        Initialize with products dataframe and precompute filter indexes.
+        Results are cached when a catalog `version` is given.
+        """
         self.products_df = products_df
+        self._n = len(products_df)
+        self.version = version
+        self.cache = cache if cache is not None else filter_result_cache
+
+        # Row positions per (lower-cased) category
+        codes, categories = pd.factorize(products_df['category'].astype(str).str.lower())
+        self._category_codes = codes
+        self._category_lookup = {category: code for code, category in enumerate(categories)}
+        self._category_rows = {
+            category: np.flatnonzero(codes == code)
+            for code, category in enumerate(categories)
+        }
+
+        # Column values and range indexes for earth_score / price filters
+        self._values = {}
+        self.range_indexes = {}
+        for column in self.RANGE_COLUMNS:
+            if column in products_df.columns:
+                self._values[column] = products_df[column].to_numpy()
+                self.range_indexes[column] = RangeIndex(self._values[column])
+
+        # (column, ascending) -> (row positions in sorted order, rank of each row)
+        self._sorted = {}
+
+    def _sort_index(self, sort_by: str, ascending: bool):
+        """Presorted order and rank for a column, built once per direction"""
+        key = (sort_by, ascending)
+        if key not in self._sorted:
+            if sort_by in self.products_df.columns:
+                values = pd.Series(self.products_df[sort_by].to_numpy())
+                order = values.sort_values(ascending=ascending, kind='stable').index.to_numpy()
+            else:
+                order = np.arange(self._n)
+            rank = np.empty(self._n, dtype=np.int64)
+            rank[order] = np.arange(self._n)
+            self._sorted[key] = (order, rank)
+        return self._sorted[key]
+
+    def _row_mask(self, rows: np.ndarray, category_code=None, ranges=()) -> np.ndarray:
+        """Which of `rows` are in the category and inside every (column, low, high) range"""
+        keep = np.ones(len(rows), dtype=bool)
+        if category_code is not None:
+            if np.ndim(category_code):
+                keep &= np.isin(self._category_codes[rows], category_code)
+            else:
+                keep &= self._category_codes[rows] == category_code
+        for column, low, high in ranges:
+            values = self._values[column][rows]
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+        return keep
+
+    def _walk(self, order: np.ndarray, limit: int, **conditions) -> np.ndarray:
+        """First `limit` rows of a presorted order that pass the conditions"""
+        found = []
+        needed = limit
+        step = max(self.WALK_BLOCK, limit)
+        for start in range(0, self._n, step):
+            if needed <= 0:
+                break
+            block = order[start:start + step]
+            block = block[self._row_mask(block, **conditions)]
+            found.append(block[:needed])
+            needed -= len(found[-1])
+        return np.concatenate(found) if found else order[:0]
+
+    def _top_k(self, rows: np.ndarray, rank: np.ndarray, limit: int) -> np.ndarray:
+        """The `limit` best rows of a candidate set, by presorted rank"""
+        if len(rows) > limit:
+            rows = rows[np.argpartition(rank[rows], limit - 1)[:limit]] if limit else rows[:0]
+        return rows[np.argsort(rank[rows])]
+
+    @staticmethod
+    def category_names(category: Union[str, List[str], None]) -> List[str]:
+        """One category or a list of them, normalized and de-duplicated"""
+        if not category:
+            return []
+        if isinstance(category, str):
+            category = [category]
+        return list(dict.fromkeys(str(name).strip().lower() for name in category))
+
+    @classmethod
+    def _cache_key(cls, category, earth_score_min, earth_score_max, sort_by, ascending,
+                   limit, price_min, price_max) -> Tuple:
+        """Normalized filter dict, so equivalent queries share one entry"""
+        def number(value, kind):
+            return None if value is None else kind(value)
+        return (
+            tuple(sorted(cls.category_names(category))),
+            number(earth_score_min, float),
+            number(earth_score_max, float),
+            number(price_min, float),
+            number(price_max, float),
+            sort_by,
+            bool(ascending),
+            max(int(limit), 0),
+        )
+
+    def filter_positions(
+        self,
+        category: Union[str, List[str], None] = None,
+        earth_score_min: Optional[int] = None,
+        earth_score_max: Optional[int] = None,
+        sort_by: str = "earth_score",
+        ascending: bool = False,
+        limit: int = 10,
+        price_min: Optional[float] = None,
+        price_max: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        Same as filter_products, but returns the row positions of the
+        matching products (in result order) instead of records.
+        Results are served from the shared LRU cache when possible.
+        """
+        filters = (category, earth_score_min, earth_score_max, sort_by, ascending,
+                   limit, price_min, price_max)
+        if self.version is None:
+            return self._compute_positions(*filters)
+
+        key = self._cache_key(*filters)
+        positions = self.cache.get(self.version, key)
+        if positions is None:
+            positions = self._compute_positions(*filters)
+            self.cache.put(self.version, key, positions)
+        return positions
+
+    def _compute_positions(
+        self,
+        category: Union[str, List[str], None] = None,
+        earth_score_min: Optional[int] = None,
+        earth_score_max: Optional[int] = None,
+        sort_by: str = "earth_score",
+        ascending: bool = False,
+        limit: int = 10,
+        price_min: Optional[float] = None,
+        price_max: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        Uncached filter_positions. Each filter maps to a row-id set whose
+        size is known up front: the category's precomputed rows, or a
+        range-index slice found by two binary searches. Either the
+        smallest set is intersected with the other filters and top-k
+        selected by rank, or the presorted order is walked until `limit`
+        rows pass - whichever touches fewer rows.
+        """
+        limit = max(int(limit), 0)
+        order, rank = self._sort_index(sort_by, ascending)
+
+        ranges = [(column, low, high) for column, low, high in (
+            ("earth_score", earth_score_min, earth_score_max),
+            ("price", price_min, price_max),
+        ) if low is not None or high is not None]
+
+        categories = self.category_names(category)
+        if not categories and not ranges:
+            return order[:limit]
+
+        # Candidate row-id sets: (size, rows-or-callable, conditions left to check)
+        candidates = []
+        category_code = None
+        if categories:
+            known = [name for name in categories if name in self._category_lookup]
+            if not known:
+                return order[:0]
+            if len(known) == 1:
+                category_code = self._category_lookup[known[0]]
+                rows = self._category_rows[known[0]]
+                get_rows = lambda rows=rows: rows
+            else:
+                category_code = np.array([self._category_lookup[name] for name in known])
+                get_rows = lambda known=known: np.sort(np.concatenate(
+                    [self._category_rows[name] for name in known]))
+            size = sum(len(self._category_rows[name]) for name in known)
+            candidates.append((size, get_rows, {"ranges": ranges}))
+        for i, (column, low, high) in enumerate(ranges):
+            index = self.range_indexes[column]
+            candidates.append((index.count(low, high),
+                               lambda index=index, low=low, high=high: index.rows(low, high),
+                               {"category_code": category_code,
+                                "ranges": ranges[:i] + ranges[i + 1:]}))
+
+        # Matches expected under independence; a walk touches ~limit / share rows
+        expected = float(self._n)
+        for size, _, _ in candidates:
+            expected *= size / max(self._n, 1)
+        smallest, get_rows, remaining = min(candidates, key=lambda c: c[0])
+        walk_cost = limit * self._n / expected if expected else float('inf')
+
+        if smallest <= walk_cost:
+            rows = get_rows()
+            rows = rows[self._row_mask(rows, **remaining)]
+            return self._top_k(rows, rank, limit)
+        return self._walk(order, limit, category_code=category_code, ranges=ranges)
 
     def filter_products(
         self,
-        category: Optional[str] = None,
+        category: Union[str, List[str], None] = None,
         earth_score_min: Optional[int] = None,
         earth_score_max: Optional[int] = None,
         sort_by: str = "earth_score",
         ascending: bool = False,
-        limit: int = 10
+        limit: int = 10,
+        price_min: Optional[float] = None,
+        price_max: Optional[float] = None
     ) -> List[Dict[str, Any]]:
         """
         Filter products based on criteria
         
         Args:
-            category: Product category to filter by
+            category: Product category (or list of categories) to filter by
             earth_score_min: Minimum EarthScore
             earth_score_max: Maximum EarthScore  
             sort_by: Column to sort by
             ascending: Sort order
             limit: Maximum number of results
+            price_min: Minimum price
+            price_max: Maximum price
             
         Returns:
             List of filtered products
         """
-        # Start with all products
-        filtered_df = self.products_df.copy()
-
-        # Apply category filter
-        if category:
-            filtered_df = filtered_df[
-                filtered_df['category'].str.lower() == category.lower()
-            ]
-
-        # Apply EarthScore filters
-        if earth_score_min is not None:
-            filtered_df = filtered_df[
-                filtered_df['earth_score'] >= earth_score_min
-            ]
-
-        if earth_score_max is not None:
-            filtered_df = filtered_df[
-                filtered_df['earth_score'] <= earth_score_max
-            ]
-
-        # Sort results
-        if sort_by in filtered_df.columns:
-            filtered_df = filtered_df.sort_values(
-                by=sort_by,
-                ascending=ascending
-            )
-
-        # Limit results
-        filtered_df = filtered_df.head(limit)
+        positions = self.filter_positions(
+            category=category,
+            earth_score_min=earth_score_min,
+            earth_score_max=earth_score_max,
+            sort_by=sort_by,
+            ascending=ascending,
+            limit=limit,
+            price_min=price_min,
+            price_max=price_max
+        )
 
         # Convert to list of dicts
-        return filtered_df.to_dict('records')
+        return self.products_df.iloc[positions].to_dict('records')
 
     def get_highest_rated(
         self,
-        category: Optional[str] = None,
+        category: Union[str, List[str], None] = None,
         limit: int = 5
     ) -> List[Dict[str, Any]]:
         """Get highest rated products"""
@@ -78,45 +358,14 @@ class ProductFilterService:
 
     def parse_filter_query(self, query: str) -> Dict[str, Any]:
         """
-        Parse natural language filter query
+        Parse natural language filter query into a filter plan
+        (keyword arguments for filter_products)
         
         Examples:
         - "products with earthscore > 60"
         - "kitchen items above 70"
         - "highest rated electronics"
+        - "top 3 kitchen or home items under $50"
+        - "beauty products below 40, cheapest first"
         """
-        query_lower = query.lower()
-        filters = {}
-
-        # Extract category
-        categories = ['kitchen', 'electronics', 'clothing', 'home', 'beauty']
-        for cat in categories:
-            if cat in query_lower:
-                filters['category'] = cat
-                break
-
-        # Extract EarthScore conditions
-        import re
-
-        # Pattern for "greater than" variations
-        gt_patterns = [
-            r'earthscore\s*>\s*(\d+)',
-            r'earth score\s*>\s*(\d+)',
-            r'score\s*>\s*(\d+)',
-            r'above\s+(\d+)',
-            r'greater\s+than\s+(\d+)'
-        ]
-
-        for pattern in gt_patterns:
-            match = re.search(pattern, query_lower)
-            if match:
-                filters['earth_score_min'] = int(match.group(1))
-                break
-
-        # Check for "highest rated"
-        if 'highest' in query_lower or 'top' in query_lower:
-            filters['sort_by'] = 'earth_score'
-            filters['ascending'] = False
-            filters['limit'] = 5
-
-        return filters
+        return parse_filter_query(query)
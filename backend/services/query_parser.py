@@ -0,0 +1,191 @@
+# services/query_parser.py
+"""
+Natural-language filter parser.
+
+All patterns are combined into one regular expression compiled at import
+time. A query is scanned once, left to right; every match is a token that
+adds to a filter plan - a dict of ProductFilterService.filter_products
+keyword arguments, e.g.
+
+    "top 3 kitchen or home items under $50 above 60"
+    -> {"category": ["kitchen", "home"], "price_max": 50.0,
+        "earth_score_min": 60, "sort_by": "earth_score",
+        "ascending": False, "limit": 3}
+
+A bare number after a comparison ("above 70") or in "between 40 and 60" is
+an EarthScore; "$", a currency word or a price word ("priced under 20")
+makes it a price.
+"""
+import re
+from functools import lru_cache
+from typing import Any, Dict
+
+# Spoken category -> catalog category
+CATEGORY_WORDS = {
+    'kitchen': 'kitchen',
+    'electronics': 'electronics',
+    'electronic': 'electronics',
+    'clothing': 'clothing',
+    'clothes': 'clothing',
+    'home': 'home',
+    'beauty': 'beauty',
+}
+
+# Comparison words -> which bound they set
+MIN_WORDS = ['greater than', 'more than', 'at least', 'minimum', 'above', 'over', 'min']
+MAX_WORDS = ['less than', 'cheaper than', 'at most', 'up to', 'maximum', 'below', 'under', 'max']
+COMPARISON_BOUNDS = {word: 'min' for word in MIN_WORDS}
+COMPARISON_BOUNDS.update({word: 'max' for word in MAX_WORDS})
+COMPARISON_BOUNDS.update({'>': 'min', '>=': 'min', '<': 'max', '<=': 'max'})
+
+# Plan keys that select products; the rest (sort_by, ascending, limit) only
+# order or cap them
+SELECTING_KEYS = ('category', 'earth_score_min', 'earth_score_max', 'price_min', 'price_max')
+
+# Sort words -> (sort_by, ascending, default limit)
+SORT_WORDS = {
+    'highest': ('earth_score', False, 5),
+    'top': ('earth_score', False, 5),
+    'best': ('earth_score', False, 5),
+    'greenest': ('earth_score', False, 5),
+    'most sustainable': ('earth_score', False, 5),
+    'lowest rated': ('earth_score', True, None),
+    'worst': ('earth_score', True, None),
+    'cheapest': ('price', True, None),
+    'lowest price': ('price', True, None),
+    'least expensive': ('price', True, None),
+    'most expensive': ('price', False, None),
+    'priciest': ('price', False, None),
+}
+
+
+def _words(words) -> str:
+    """
+    Regex matching any of the words, factored into a character trie
+    ('a(?:bove|t\\s+(?:least|most))') so the engine does not retry
+    every word at every position
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern(node) -> str:
+        branches = []
+        for char in sorted((char for char in node if char), reverse=True):
+            atom = r"\s+" if char == " " else re.escape(char)
+            branches.append(atom + pattern(node[char]))
+        # Longer words first, then the word ending here ('min' after 'minimum')
+        if "" in node:
+            branches.append("")
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return pattern(trie)
+
+
+_NUMBER = r"\d+(?:\.\d+)?"
+_OPS = _words(COMPARISON_BOUNDS.keys() - {'>', '>=', '<', '<='})
+_CURRENCY = r"(?:dollars?|usd|bucks)\b"
+_PRICE_WORDS = r"(?:price[sd]?|costs?|costing)"
+
+# Alternatives are tried in this order at each position; after a comparison
+# word, a "$", currency word or leading price word makes the number a price,
+# otherwise it is an EarthScore. Matches only start where a word (or "$")
+# starts, and the group that closes last names the token kind.
+_TOKEN = re.compile("(?<![a-z0-9])(?:" + "|".join([
+    rf"(?:between\s+)?\$\s*(?P<price_low>{_NUMBER})\s*(?:-|to|and)\s*\$?\s*(?P<price_range>{_NUMBER})",
+    rf"{_PRICE_WORDS}\s+(?P<price_op>{_OPS})\s+\$?\s*(?P<price_named>{_NUMBER})\b(?!\.\d)",
+    rf"(?P<op>{_OPS})\s+(?:\$\s*(?P<price>{_NUMBER})|(?P<price_words>{_NUMBER})\s*{_CURRENCY}"
+    rf"|(?P<score>\d+)\b(?!\.\d))",
+    rf"between\s+(?P<score_low>\d+)\s+and\s+(?P<score_range>\d+)\b",
+    rf"(?:earth\s*score|score|rating)\s*(?P<score_cmp>>=|<=|>|<)\s*(?P<score_compare>\d+)",
+    rf"(?P<limit_word>top|best|first)\s+(?P<limit>\d+)\b",
+    rf"(?P<count>\d+)\s+(?:products|items|results|options)\b",
+    rf"(?P<sort>{_words(SORT_WORDS)})\b",
+    rf"(?P<category>{_words(CATEGORY_WORDS)})\b",
+]) + ")")
+
+
+# Token kinds that order or cap results rather than select them
+_ORDERING_KINDS = frozenset(['sort', 'limit', 'count'])
+
+
+def _bound(op: str) -> str:
+    return COMPARISON_BOUNDS[" ".join(op.split())]
+
+
+def is_selective(plan: Dict[str, Any]) -> bool:
+    """Whether a plan narrows the catalog (not just sorts or caps it)"""
+    return any(key in plan for key in SELECTING_KEYS)
+
+
+def strip_ordering_terms(query: str) -> str:
+    """
+    The lower-cased query without its sort and limit phrases, leaving the
+    search terms: "best 3 water bottles" -> "water bottles"
+    """
+    query = " ".join(query.lower().split())
+    return " ".join(_TOKEN.sub(
+        lambda match: " " if match.lastgroup in _ORDERING_KINDS else match.group(0),
+        query).split())
+
+
+def parse_filter_query(query: str) -> Dict[str, Any]:
+    """
+    Compile a natural-language query into a filter plan.
+    Keys are only present for the parts the query mentions.
+    """
+    # Chat repeats the same few queries, so plans are memoized by their
+    # normalized text; callers get their own copy
+    return dict(_cached_plan(" ".join(query.lower().split())))
+
+
+@lru_cache(maxsize=1024)
+def _cached_plan(query: str) -> Dict[str, Any]:
+    return compile_plan(query)
+
+
+def compile_plan(query: str) -> Dict[str, Any]:
+    """Single left-to-right scan of a lower-cased query (uncached)"""
+    plan: Dict[str, Any] = {}
+    categories = []
+
+    for match in _TOKEN.finditer(query):
+        kind = match.lastgroup
+        if kind == 'category':
+            category = CATEGORY_WORDS[match.group(kind)]
+            if category not in categories:
+                categories.append(category)
+        elif kind == 'sort':
+            sort_by, ascending, limit = SORT_WORDS[" ".join(match.group(kind).split())]
+            plan['sort_by'], plan['ascending'] = sort_by, ascending
+            if limit is not None:
+                plan.setdefault('limit', limit)
+        elif kind == 'score':
+            plan[f"earth_score_{_bound(match.group('op'))}"] = int(match.group(kind))
+        elif kind == 'score_compare':
+            plan[f"earth_score_{_bound(match.group('score_cmp'))}"] = int(match.group(kind))
+        elif kind == 'score_range':
+            low, high = sorted([int(match.group('score_low')), int(match.group(kind))])
+            plan['earth_score_min'], plan['earth_score_max'] = low, high
+        elif kind in ('price', 'price_words'):
+            plan[f"price_{_bound(match.group('op'))}"] = float(match.group(kind))
+        elif kind == 'price_named':
+            plan[f"price_{_bound(match.group('price_op'))}"] = float(match.group(kind))
+        elif kind == 'price_range':
+            low, high = sorted([float(match.group('price_low')), float(match.group(kind))])
+            plan['price_min'], plan['price_max'] = low, high
+        elif kind == 'limit':
+            if match.group('limit_word') in SORT_WORDS:
+                plan['sort_by'], plan['ascending'], _ = SORT_WORDS[match.group('limit_word')]
+            plan['limit'] = int(match.group(kind))
+        elif kind == 'count':
+            plan['limit'] = int(match.group(kind))
+
+    if categories:
+        plan['category'] = categories[0] if len(categories) == 1 else categories
+    return plan
@@ -0,0 +1,185 @@
+# services/search_index.py
+"""
+Inverted token index over product text, built when the catalog loads.
+"""
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_token(token: str) -> str:
+    """Very light stemming so 'bottles' finds 'bottle'"""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [normalize_token(token) for token in _TOKEN.findall(str(text).lower())]
+
+
+class InvertedIndex:
+    def __init__(self, texts: Iterable[str]):
+        """Map each token to the sorted row ids of the texts containing it"""
+        postings: Dict[str, List[int]] = defaultdict(list)
+        stems: Dict[str, str] = {}
+        for row, text in enumerate(texts):
+            raw_tokens = _TOKEN.findall(text.lower())
+            for token in {stems.get(raw) or stems.setdefault(raw, normalize_token(raw))
+                          for raw in raw_tokens}:
+                postings[token].append(row)
+        self._postings = {token: np.array(rows, dtype=np.int64)
+                          for token, rows in postings.items()}
+        self._empty = np.empty(0, dtype=np.int64)
+
+    def __contains__(self, token: str) -> bool:
+        return normalize_token(token) in self._postings
+
+    def vocabulary(self) -> List[str]:
+        """Every indexed token"""
+        return list(self._postings)
+
+    def postings(self, token: str) -> np.ndarray:
+        return self._postings.get(normalize_token(token), self._empty)
+
+    def search(self, tokens: List[str], scores: Optional[np.ndarray] = None,
+               limit: Optional[int] = 10) -> np.ndarray:
+        """
+        Rows matching any of the tokens, best first: rows containing more
+        of the query tokens rank higher (so full intersections come first),
+        then higher `scores`, then row order.
+        """
+        lists = [self.postings(token) for token in dict.fromkeys(tokens)]
+        lists = [rows for rows in lists if len(rows)]
+        if not lists:
+            return self._empty
+
+        if len(lists) == 1:
+            rows = lists[0]
+            matched = np.ones(len(rows), dtype=np.int64)
+        else:
+            rows, matched = np.unique(np.concatenate(lists), return_counts=True)
+        row_scores = np.zeros(len(rows)) if scores is None else scores[rows]
+
+        # Narrow to the candidates that can make the top `limit` (ties kept)
+        # so the exact sort below only sees a handful of rows
+        if limit is not None and len(rows) > limit:
+            key = matched * (np.abs(row_scores).max() * 2 + 1) + row_scores
+            threshold = np.partition(key, len(key) - limit)[len(key) - limit]
+            keep = key >= threshold
+            rows, matched, row_scores = rows[keep], matched[keep], row_scores[keep]
+
+        order = np.lexsort((rows, -row_scores, -matched))
+        return rows[order[:limit]]
+
+
+def word_trigrams(word: str) -> set:
+    """Character trigrams of a word, padded like pg_trgm ('  a', ' ab', 'abc', 'bc ')"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Typo-tolerant name matching. Character trigrams index the distinct
+    words of all names; each word keeps the rows that contain it. A query
+    word is matched to similar name words by trigram similarity, and a row
+    scores the average, over query words, of its best word similarity.
+    """
+
+    def __init__(self, texts: Iterable[str]):
+        word_rows: Dict[str, List[int]] = defaultdict(list)
+        word_counts = []
+        for row, text in enumerate(texts):
+            words = set(_TOKEN.findall(str(text).lower()))
+            word_counts.append(len(words))
+            for word in words:
+                word_rows[word].append(row)
+
+        self._words = list(word_rows)
+        self._word_rows = [np.array(word_rows[word], dtype=np.int64) for word in self._words]
+        self._word_counts = np.array(word_counts, dtype=np.int64)
+
+        gram_words: Dict[str, List[int]] = defaultdict(list)
+        sizes = []
+        for word_id, word in enumerate(self._words):
+            grams = word_trigrams(word)
+            sizes.append(len(grams))
+            for gram in grams:
+                gram_words[gram].append(word_id)
+        self._gram_words = {gram: np.array(ids, dtype=np.int64)
+                            for gram, ids in gram_words.items()}
+        self._word_sizes = np.array(sizes, dtype=np.float64)
+
+    def word_rows(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """(word, rows containing it) for every indexed word"""
+        return zip(self._words, self._word_rows)
+
+    def similar_words(self, word: str, min_similarity: float = 0.3) -> List[Tuple[int, float]]:
+        """(word id, Jaccard trigram similarity) for indexed words close to `word`"""
+        grams = word_trigrams(word)
+        lists = [self._gram_words[gram] for gram in grams if gram in self._gram_words]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self._words))
+        ids = np.flatnonzero(shared)
+        similarity = shared[ids] / (len(grams) + self._word_sizes[ids] - shared[ids])
+        keep = similarity >= min_similarity
+        return list(zip(ids[keep].tolist(), similarity[keep].tolist()))
+
+    def search(self, query: str, k: int = 5, min_similarity: float = 0.0,
+               word_similarity: float = 0.3, require_all: bool = False,
+               min_coverage: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        Top-k fuzzy matches as (row, similarity) pairs, best first.
+        Query words only match name words at least `word_similarity` alike;
+        with require_all, a row must match every query word, and the query
+        must have at least `min_coverage` times as many words as the name.
+        Ties go to names with fewer words (closer to the query), then row order.
+        """
+        query_words = list(dict.fromkeys(_TOKEN.findall(str(query).lower())))
+        if not query_words:
+            return []
+
+        # Best similarity per row for each query word, kept sparse
+        row_parts, score_parts = [], []
+        for query_word in query_words:
+            candidates = self.similar_words(query_word, word_similarity)
+            if not candidates:
+                if require_all:
+                    return []
+                continue
+            rows = np.concatenate([self._word_rows[word_id] for word_id, _ in candidates])
+            sims = np.concatenate([np.full(len(self._word_rows[word_id]), similarity)
+                                   for word_id, similarity in candidates])
+            if len(candidates) > 1:
+                order = np.lexsort((-sims, rows))
+                rows, sims = rows[order], sims[order]
+                first = np.ones(len(rows), dtype=bool)
+                first[1:] = rows[1:] != rows[:-1]
+                rows, sims = rows[first], sims[first]
+            row_parts.append(rows)
+            score_parts.append(sims)
+        if not row_parts:
+            return []
+
+        rows, inverse = np.unique(np.concatenate(row_parts), return_inverse=True)
+        similarity = np.bincount(inverse, weights=np.concatenate(score_parts)) / len(query_words)
+        keep = similarity >= min_similarity
+        if require_all:
+            keep &= np.bincount(inverse) == len(query_words)
+        if min_coverage:
+            keep &= len(query_words) >= min_coverage * self._word_counts[rows]
+        rows, similarity = rows[keep], similarity[keep]
+        if len(rows) > k:
+            # Keep only candidates that can make the top k (ties included)
+            threshold = np.partition(similarity, len(rows) - k)[len(rows) - k]
+            keep = similarity >= threshold
+            rows, similarity = rows[keep], similarity[keep]
+
+        order = np.lexsort((rows, self._word_counts[rows], -similarity))[:k]
+        return [(int(rows[i]), float(similarity[i])) for i in order]
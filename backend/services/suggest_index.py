@@ -0,0 +1,95 @@
+# services/suggest_index.py
+"""
+Prefix trie for search-box typeahead, built when the catalog loads.
+
+Keys are the words of normalized product names plus the category names.
+Every trie node (stored in a dict keyed by its prefix) keeps the top
+products, by EarthScore, among all products containing a word under it, so
+a keystroke is a single dict lookup. Multi-word queries intersect the
+earlier words' rows with the rows of every word under the last prefix.
+"""
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class SuggestTrie:
+    # Completions kept per node for single-word queries
+    TOP_N = 32
+
+    def __init__(self, word_rows: Iterable[Tuple[str, np.ndarray]],
+                 scores: np.ndarray, top_n: int = TOP_N):
+        """
+        word_rows: (word, sorted row positions containing it) pairs
+        scores:    ranking score per row (higher first, ties by row)
+        """
+        self.top_n = top_n
+        # Global rank of each row; nodes store ranks so merging is a sort
+        self._order = np.lexsort((np.arange(len(scores)), -np.asarray(scores)))
+        self._rank = rank = np.empty(len(scores), dtype=np.int64)
+        rank[self._order] = np.arange(len(scores))
+
+        # Each word's full rows (for multi-word queries) and own best ranks
+        self._word_rows: Dict[str, np.ndarray] = {}
+        pending: Dict[str, List[np.ndarray]] = {}
+        for word, rows in word_rows:
+            rows = np.asarray(rows, dtype=np.int64)
+            if word in self._word_rows:
+                rows = np.union1d(self._word_rows[word], rows)
+            self._word_rows[word] = rows
+            ranks = rank[rows]
+            if len(ranks) > top_n:
+                ranks = np.partition(ranks, top_n - 1)[:top_n]
+            pending.setdefault(word, []).append(ranks)
+        self._words = sorted(self._word_rows)
+
+        # Fill nodes from the longest prefixes up: a node's completions are
+        # the best of its own word's and its children's
+        for word in list(pending):
+            for end in range(1, len(word)):
+                pending.setdefault(word[:end], [])
+        self._nodes: Dict[str, np.ndarray] = {}
+        for prefix in sorted(pending, key=len, reverse=True):
+            ranks = np.unique(np.concatenate(pending[prefix]))[:top_n]
+            self._nodes[prefix] = ranks
+            if len(prefix) > 1:
+                pending[prefix[:-1]].append(ranks)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def suggest(self, query: str, limit: int = 8) -> np.ndarray:
+        """
+        Row positions completing the query, best EarthScore first. The last
+        word is a prefix; earlier words must appear in the product's text.
+        """
+        words = _TOKEN.findall(str(query).lower())
+        if not words:
+            return np.empty(0, dtype=np.int64)
+        ranks = self._nodes.get(words[-1])
+        if ranks is None:
+            return np.empty(0, dtype=np.int64)
+
+        if len(words) == 1:
+            return self._order[ranks][:limit]
+
+        # Rows holding every earlier word, smallest posting list first
+        required = [self._word_rows.get(word) for word in set(words[:-1])]
+        if any(rows is None for rows in required):
+            return np.empty(0, dtype=np.int64)
+        required.sort(key=len)
+        rows = required[0]
+        for other in required[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+
+        # ... and a word under the last prefix (words sort contiguously)
+        prefix = words[-1]
+        start = bisect_left(self._words, prefix)
+        stop = bisect_left(self._words, prefix + "\U0010ffff", start)
+        completing = np.concatenate([self._word_rows[word] for word in self._words[start:stop]])
+        rows = rows[np.isin(rows, completing)]
+        return rows[np.argsort(self._rank[rows], kind='stable')[:limit]]
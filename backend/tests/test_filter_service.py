@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.filter_service import ProductFilterService, RangeIndex
+
+
+@pytest.fixture
+def products_with_nan_prices():
+    rng = np.random.default_rng(0)
+    n = 1000
+    price = rng.uniform(0, 100, n)
+    price[rng.choice(n, 50, replace=False)] = np.nan
+    return pd.DataFrame({
+        "product_id": np.arange(n),
+        "category": rng.choice(["home", "kitchen", "beauty"], n),
+        "price": price,
+        "earth_score": rng.integers(0, 101, n),
+    })
+
+
+def test_range_index_skips_nan():
+    index = RangeIndex(np.array([5.0, np.nan, 1.0, np.nan, 9.0]))
+    assert sorted(index.rows(low=2).tolist()) == [0, 4]
+    assert index.count(low=2) == 2
+    assert sorted(index.rows().tolist()) == [0, 2, 4]
+
+
+@pytest.mark.parametrize("price_min, price_max", [(10, None), (None, 50), (10, 50)])
+def test_price_range_matches_pandas(products_with_nan_prices, price_min, price_max):
+    df = products_with_nan_prices
+    service = ProductFilterService(df)
+    expected = df["price"].between(price_min if price_min is not None else -np.inf,
+                                   price_max if price_max is not None else np.inf)
+
+    positions = service.filter_positions(price_min=price_min, price_max=price_max, limit=len(df))
+    assert sorted(positions.tolist()) == np.flatnonzero(expected).tolist()
+    assert service.range_indexes["price"].count(price_min, price_max) == int(expected.sum())
+
+
+def test_price_min_with_category_excludes_nan(products_with_nan_prices):
+    df = products_with_nan_prices
+    service = ProductFilterService(df)
+    expected = np.flatnonzero((df["category"] == "kitchen") & (df["price"] >= 10))
+    positions = service.filter_positions(category="kitchen", price_min=10, limit=len(df))
+    assert sorted(positions.tolist()) == expected.tolist()
@@ -87,3 +87,20 @@ class MessageTemplates:
         else:
             template = MessageTemplates.PRODUCT_SELECTED[0]
             return template.format(score=earth_score)
+
+    @staticmethod
+    def get_alternatives_message(product: Dict, alternatives: List[Dict]) -> str:
+        """List greener alternatives to a product"""
+        name = product['product_name']
+        score = product.get('earth_score', 'N/A')
+        if not alternatives:
+            return (f"**{name}** (EarthScore: {score}/100) is already one of the greenest "
+                    f"{product.get('category', '')} products we carry! 🏆")
+
+        response = f"Greener alternatives to **{name}** (EarthScore: {score}/100):\n\n"
+        for i, alternative in enumerate(alternatives, 1):
+            gain = alternative['earth_score'] - product['earth_score']
+            response += (f"{i}. 🌿 **{alternative['product_name']}** - ${alternative['price']:.2f} "
+                         f"(EarthScore: {alternative['earth_score']}/100, +{gain})\n")
+        response += "\nThese are the closest matches on materials, footprint and price that score higher."
+        return response
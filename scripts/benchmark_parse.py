@@ -0,0 +1,93 @@
+import sys
+import os
+# Add the backend path to sys.path to import the services
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'backend')))
+
+from services.catalog_service import ProductCatalog
+from services.query_parser import compile_plan, parse_filter_query
+import argparse
+import json
+import re
+import time
+import pandas as pd
+
+# Natural-language filter parsing: the old per-call regex loop vs the
+# compiled single-pass parser, uncached and with its plan memo. Checks every
+# corpus query against its expected plan first, then reports parse
+# throughput and plan run time.
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'filter_query_corpus.json')
+
+
+def old_parse(query):
+    query_lower = query.lower()
+    filters = {}
+    categories = ['kitchen', 'electronics', 'clothing', 'home', 'beauty']
+    for cat in categories:
+        if cat in query_lower:
+            filters['category'] = cat
+            break
+    import re
+    gt_patterns = [
+        r'earthscore\s*>\s*(\d+)',
+        r'earth score\s*>\s*(\d+)',
+        r'score\s*>\s*(\d+)',
+        r'above\s+(\d+)',
+        r'greater\s+than\s+(\d+)'
+    ]
+    for pattern in gt_patterns:
+        match = re.search(pattern, query_lower)
+        if match:
+            filters['earth_score_min'] = int(match.group(1))
+            break
+    if 'highest' in query_lower or 'top' in query_lower:
+        filters['sort_by'] = 'earth_score'
+        filters['ascending'] = False
+        filters['limit'] = 5
+    return filters
+
+
+def per_second(fn, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(query)
+    return repeat * len(queries) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+
+    failures = [(case["query"], case["plan"], parse_filter_query(case["query"]))
+                for case in corpus if parse_filter_query(case["query"]) != case["plan"]]
+    for query, expected, got in failures:
+        print(f"❌ {query!r}: expected {expected}, got {got}")
+    print(f"Corpus: {len(corpus) - len(failures)}/{len(corpus)} plans match")
+
+    queries = [case["query"] for case in corpus]
+    re.purge()
+    old_qps = per_second(old_parse, queries, args.repeat)
+    cold_qps = per_second(lambda query: compile_plan(query.lower()), queries, args.repeat)
+    memo_qps = per_second(parse_filter_query, queries, args.repeat)
+    print(f"old parser:         {old_qps:>10,.0f} queries/s")
+    print(f"compiled, uncached: {cold_qps:>10,.0f} queries/s ({cold_qps / old_qps:.1f}x)")
+    print(f"compiled, memo:     {memo_qps:>10,.0f} queries/s ({memo_qps / old_qps:.1f}x)")
+
+    # Plans run directly against the indexed catalog
+    catalog = ProductCatalog(pd.read_csv(os.path.join(
+        os.path.dirname(__file__), '..', 'data', 'products_large.csv')))
+    catalog.filter_service.version = None  # measure the filter, not the cache
+    plans = [case["plan"] for case in corpus if case["plan"]]
+    start = time.perf_counter()
+    for plan in plans:
+        catalog.filter_service.filter_positions(**plan)
+    run_ms = (time.perf_counter() - start) * 1000 / len(plans)
+    print(f"plan execution: {run_ms:.3f} ms/query over {len(catalog)} products")
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,115 @@
+import sys
+import os
+# Add the backend path to sys.path to import the ML modules
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(BACKEND_DIR)
+
+from ml.engine import FEATURES
+from ml.predictor import EarthScorePredictor, PredictionBatcher
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import pickle
+import time
+import numpy as np
+import pandas as pd
+
+# Concurrent single-product predictions (what /api/predict serves): one
+# model call per request vs the micro-batcher, at several client counts.
+# Also single-call latency: DataFrame path vs fast path vs memo hit, and the
+# exact engine path that serves products with all features present. Catalog
+# records are complete, so the model rows use a predictor with exact=False.
+
+
+def load_predictor(memo_size: int = EarthScorePredictor.MEMO_SIZE,
+                   exact: bool = True) -> EarthScorePredictor:
+    with open(os.path.join(BACKEND_DIR, 'ml', 'imputer.pkl'), 'rb') as f:
+        imputer = pickle.load(f)
+    with open(os.path.join(BACKEND_DIR, 'ml', 'model.pkl'), 'rb') as f:
+        model = pickle.load(f)
+    return EarthScorePredictor(imputer, model, memo_size=memo_size, exact=exact)
+
+
+def load_records():
+    products = pd.read_csv(os.path.join(os.path.dirname(__file__), '..', 'data', 'products_large.csv'))
+    features = products[FEATURES]
+    return features.astype(object).where(features.notna(), None).to_dict('records')
+
+
+def run(predict, records, clients: int, requests: int):
+    """(requests/s, latencies in ms) for `clients` threads sharing `requests` calls"""
+    latencies = []
+
+    def client(indices):
+        for i in indices:
+            start = time.perf_counter()
+            predict(records[i % len(records)])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    chunks = np.array_split(np.arange(requests), clients)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, chunks))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, np.array(latencies)
+
+
+def single_call(predict, records, repeat: int):
+    """Latencies (ms) of `repeat` sequential calls cycling through records"""
+    latencies = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        predict(records[i % len(records)])
+        latencies[i] = (time.perf_counter() - start) * 1000
+    return latencies
+
+
+def unique_records(records, count: int):
+    """`count` distinct feature records (jittered copies), so nothing hits the memo"""
+    rng = np.random.default_rng(0)
+    result = []
+    for i in range(count):
+        record = dict(records[i % len(records)])
+        for feature, value in record.items():
+            if value is not None:
+                record[feature] = float(value) * rng.uniform(0.9, 1.1)
+        result.append(record)
+    return result
+
+
+def percentiles(latencies) -> str:
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return f"{p50:>7.2f} {p95:>7.2f} {p99:>7.2f}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", default="1,8,32,64")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    predictor = load_predictor(exact=False)
+    records = load_records()
+
+    print(f"{'single call':>22} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7}")
+    fresh = unique_records(records, args.requests)
+    print(f"{'DataFrame path':>22} {percentiles(single_call(predictor.predict_one, fresh, args.requests))}")
+    print(f"{'fast path (memo miss)':>22} {percentiles(single_call(predictor.predict_fast, fresh, args.requests))}")
+    print(f"{'fast path (memo hit)':>22} {percentiles(single_call(predictor.predict_fast, fresh, args.requests))}")
+    exact = load_predictor()
+    print(f"{'exact path':>22} {percentiles(single_call(exact.predict_fast, fresh, args.requests))}")
+    print()
+
+    # Memo off so the batcher comparison measures model calls, not cache hits
+    predictor = load_predictor(memo_size=0, exact=False)
+    batcher = PredictionBatcher(predictor, window_ms=args.window_ms, max_batch=args.max_batch)
+
+    print(f"{'clients':>7} {'mode':>8} {'req/s':>9} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7}")
+    for clients in [int(c) for c in args.clients.split(",")]:
+        for mode, predict in (("direct", predictor.predict_one), ("batched", batcher.predict)):
+            throughput, latencies = run(predict, records, clients, args.requests)
+            print(f"{clients:>7} {mode:>8} {throughput:>9.0f} {percentiles(latencies)}")
+
+    print(f"\nBatcher: {batcher.stats()}")
+    batcher.close()
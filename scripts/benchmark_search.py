@@ -0,0 +1,89 @@
+import sys
+import os
+# Add the backend path to sys.path to import the services
+sys.path.append(os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'backend')))
+
+from services.catalog_service import ProductCatalog
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+# Product text search: regex str.contains scan (old path) vs the inverted
+# token index (ProductCatalog.search_text), across catalog sizes, plus the
+# offline semantic index (ProductCatalog.semantic_search) on misspelled
+# queries.
+
+QUERIES = [
+    "scalable portals",
+    "frictionless wearable kit",
+    "innovative e-commerce gadget",
+    "mission-critical interfaces",
+    "synergistic solutions appliance",
+]
+
+# Misspellings and word variants the token index cannot match
+FUZZY_QUERIES = [
+    "scalabel portal",
+    "frictionles wearables",
+    "inovative e-comerce gadgts",
+    "mision critical interface",
+    "synergy solution aplliance",
+]
+
+
+def make_catalog(base_df: pd.DataFrame, size: int, seed: int = 42) -> pd.DataFrame:
+    """Synthetic catalog of `size` rows reusing the real name vocabulary"""
+    rng = np.random.default_rng(seed)
+    words = np.array(sorted({w for name in base_df['product_name'] for w in name.split()}))
+    rows = base_df.sample(size, replace=True, random_state=seed).reset_index(drop=True)
+    picks = rng.integers(0, len(words), size=(size, 4))
+    rows['product_name'] = [" ".join(words[p]) for p in picks]
+    rows['product_id'] = np.arange(1, size + 1)
+    return rows
+
+
+def old_search(products_df: pd.DataFrame, words):
+    search_pattern = '|'.join(words)
+    mask = (
+        products_df['product_name'].str.contains(search_pattern, case=False, na=False, regex=True) |
+        products_df['category'].str.contains(search_pattern, case=False, na=False, regex=True)
+    )
+    results = products_df[mask].sort_values('earth_score', ascending=False)
+    return results.head(10)
+
+
+def time_ms(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    base_df = pd.read_csv(os.path.join(
+        os.path.dirname(__file__), '..', 'data', 'products_large.csv'))
+
+    print(f"{'rows':>10} {'build (s)':>10} {'old (ms)':>10} {'indexed (ms)':>13} {'speedup':>8}"
+          f" {'semantic (ms)':>14}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        products_df = make_catalog(base_df, size)
+
+        start = time.perf_counter()
+        catalog = ProductCatalog(products_df)
+        build_s = time.perf_counter() - start
+
+        old_ms = np.mean([time_ms(lambda: old_search(catalog.df, q.split()), args.repeat)
+                          for q in QUERIES])
+        new_ms = np.mean([time_ms(lambda: catalog.search_text(q.split()), args.repeat)
+                          for q in QUERIES])
+        semantic_ms = np.mean([time_ms(lambda: catalog.semantic_search(q), args.repeat)
+                               for q in FUZZY_QUERIES])
+        print(f"{size:>10} {build_s:>10.2f} {old_ms:>10.2f} {new_ms:>13.3f} {old_ms / new_ms:>7.0f}x"
+              f" {semantic_ms:>14.3f}")
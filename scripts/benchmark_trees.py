@@ -0,0 +1,91 @@
+import sys
+import os
+# Add the backend path to sys.path to import the ML modules
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(BACKEND_DIR)
+
+from ml.engine import NORM_RANGES
+from ml.tree_export import MODEL_PATH, TREES_PATH, TreeEnsemble, export_model_file, file_sha1
+import argparse
+import pickle
+import subprocess
+import time
+import numpy as np
+
+# NumPy tree evaluator (ml.tree_export) vs the native XGBoost model:
+# prediction parity, cold start-up in a fresh interpreter, and latency per
+# batch size.
+
+STARTUP = {
+    "native": "import pickle; pickle.load(open({model!r}, 'rb'))",
+    "numpy trees": "from ml.tree_export import TreeEnsemble; TreeEnsemble.load({trees!r})",
+}
+
+
+def random_features(rows: int, missing: float, seed: int = 0) -> np.ndarray:
+    """Feature rows spanning (and a little past) NORM_RANGES, some values NaN"""
+    rng = np.random.default_rng(seed)
+    features = np.column_stack([rng.uniform(low - (high - low) * 0.1, high + (high - low) * 0.1, rows)
+                                for low, high in NORM_RANGES.values()])
+    features[rng.random(features.shape) < missing] = np.nan
+    return features
+
+
+def startup_ms(code: str, repeat: int) -> float:
+    """Median wall time (ms) of `code` in a fresh interpreter, minus bare start-up"""
+    def run(snippet):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", snippet], cwd=BACKEND_DIR, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        return np.median(times) * 1000
+    return run(code) - run("pass")
+
+
+def latency_us(predict, features, budget_s: float = 0.5) -> float:
+    """Median microseconds per call"""
+    predict(features)
+    times = []
+    deadline = time.perf_counter() + budget_s
+    while time.perf_counter() < deadline or len(times) < 5:
+        start = time.perf_counter()
+        predict(features)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1,8,32,64,256,1000,10000")
+    parser.add_argument("--parity-rows", type=int, default=100_000)
+    parser.add_argument("--missing", type=float, default=0.15)
+    parser.add_argument("--startup-repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(MODEL_PATH, 'rb') as f:
+        model = pickle.load(f)
+    booster = model.get_booster()
+    if not os.path.exists(TREES_PATH) or TreeEnsemble.load(TREES_PATH).source_sha1 != file_sha1(MODEL_PATH):
+        export_model_file()
+        print(f"Re-exported {TREES_PATH}")
+    trees = TreeEnsemble.load(TREES_PATH)
+    print(f"{len(trees)} trees, depth {trees.depth}")
+
+    features = random_features(args.parity_rows, args.missing)
+    native, ours = booster.inplace_predict(features), trees.predict(features)
+    print(f"Parity on {len(features)} rows: max |diff| {np.abs(native - ours).max():.3g}, "
+          f"{int((native != ours).sum())} rows differ, "
+          f"{int((np.trunc(native) != np.trunc(ours)).sum())} EarthScores differ\n")
+
+    print(f"{'cold start':>12} {'ms':>8}")
+    for name, code in STARTUP.items():
+        print(f"{name:>12} {startup_ms(code.format(model=MODEL_PATH, trees=TREES_PATH), args.startup_repeat):>8.1f}")
+
+    print(f"\n{'rows':>6} {'native us':>10} {'numpy us':>10} {'speedup':>8}")
+    for rows in [int(size) for size in args.sizes.split(",")]:
+        batch = random_features(rows, args.missing, seed=rows)
+        native_us = latency_us(booster.inplace_predict, batch)
+        numpy_us = latency_us(trees.predict, batch)
+        print(f"{rows:>6} {native_us:>10.1f} {numpy_us:>10.1f} {native_us / numpy_us:>7.2f}x")
@@ -4,7 +4,8 @@ import os
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), '..', 'backend')))
 
-from ml.engine import calculate_earth_score
+from ml.engine import calculate_earth_scores, FEATURES
+from ml.tree_export import export_model_file
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.impute import SimpleImputer
@@ -19,15 +20,11 @@ print("Loaded generated data.")
 
 # 2. Create Target Variable (Ground Truth)
 # We use our original heuristic to create the 'earth_score' we want to predict
-df['earth_score'] = df.apply(calculate_earth_score, axis=1)
+df['earth_score'] = calculate_earth_scores(df)
 print("Generated 'earth_score' as target variable using heuristic.")
 
 # 3. Define Features (X) and Target (y)
-features = [
-    'manufacturing_emissions_gco2e', 'transport_distance_km',
-    'recyclability_percent', 'biodegradability_score', 'is_fair_trade',
-    'supply_chain_transparency_score', 'durability_rating', 'repairability_index'
-]
+features = FEATURES
 X = df[features]
 y = df['earth_score']
 
@@ -55,6 +52,10 @@ with open('../backend/ml/model.pkl', 'wb') as f:
     pickle.dump(model, f)
 print("Trained and saved XGBoost model to backend/ml/model.pkl")
 
+# Flat NumPy copy of the trees, so serving can skip importing xgboost
+trees = export_model_file('../backend/ml/model.pkl', '../backend/ml/model_trees.npz')
+print(f"Exported {len(trees)} trees to backend/ml/model_trees.npz")
+
 # 7. Evaluate Model
 score = model.score(X_test_imputed, y_test)
 print(f"Model evaluation complete. R^2 Score: {score:.4f}")